@@ -3,13 +3,16 @@
 from datetime import datetime
 
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
 
+from app.core.db_manager import get_database_manager
+from app.core.dependencies import get_ai_service
 from app.models.responses import HealthResponse
 
 from . import restaurant_routes, session_routes
 
-# 創建主路由器
-api_router = APIRouter()
+# 創建主路由器（orjson 序列化，健康檢查等原生 dict 端點也受惠）
+api_router = APIRouter(default_response_class=ORJSONResponse)
 
 # 包含所有子路由
 api_router.include_router(restaurant_routes.router, tags=["restaurant"])
@@ -21,6 +24,16 @@ async def health_check():
     """API 健康檢查"""
     return {"status": "healthy", "service": "restaurant-search-api"}
 
+# 輕量監控端點：連接池與各層快取的使用狀況
+@api_router.get("/metrics")
+async def metrics():
+    """服務內部指標（連接池、回應快取、意圖快取）"""
+    return {
+        "db_pool": get_database_manager().pool_stats(),
+        "response_cache": restaurant_routes.response_cache.stats(),
+        "intent_cache": get_ai_service().intent_cache_stats(),
+    }
+
 # 根路徑健康檢查
 @api_router.get("/", response_model=HealthResponse)
 async def root():
@@ -1,13 +1,18 @@
 # app/api/routes.py
+import asyncio
 import logging
+from types import MappingProxyType
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
 
 from app.core.dependencies import (
     get_ai_service,
     get_restaurant_service,
     get_session_service,
 )
+from app.core.response_cache import AsyncTTLCache
+from app.models.data_models import SearchParams
 from app.models.requests import SearchRequest
 from app.models.responses import SearchResponseModel
 from app.prompts.enums import MessageRole
@@ -15,9 +20,50 @@ from app.services.gemini_ai_service import GeminiAIService
 from app.services.restaurant_service import RestaurantService
 from app.services.session_service import SessionService
 
-router = APIRouter()
+# orjson 序列化比預設 json 快數倍，減少事件迴圈上的 CPU 佔用
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
+# 回應 metadata 的靜態部分，模組載入時建立一次
+_STATIC_METADATA = {"search_completed": True}
+
+# 零結果時的罐頭訊息：內容固定，不需逐請求組字串（更不需 AI 呼叫）
+_NO_RESULTS_MESSAGE = "抱歉，沒有找到符合條件的餐廳。建議您擴大搜尋範圍或調整條件。"
+
+# 完整回應的精確比對快取：同一用戶短時間內重送相同請求時，
+# Gemini 分析與資料庫查詢整段跳過
+response_cache = AsyncTTLCache(maxsize=2048, ttl=60.0)
+
+# 只快取這些回應型別（錯誤回應不該被固定住）
+_CACHEABLE_TYPES = frozenset({"success", "partial"})
+_CACHE_MIN_CONFIDENCE = 0.6
+
+# 價格等級 → 資料庫價格區間：模組載入時建一次，不逐請求重配置
+_PRICE_MAP = MappingProxyType({1: "budget", 2: "mid_range", 3: "high_mid", 4: "expensive"})
+_DEFAULT_PRICE = "mid_range"
+
+# 分析失敗的回應內容固定，整個物件在載入時建好重複使用
+_ANALYSIS_FAILED_RESPONSE = SearchResponseModel.model_construct(
+    type="error",
+    message="抱歉，無法理解您的需求，請重新描述。",
+    recommendations=[],
+    criteria=None,
+    missing_fields=[],
+    metadata={"analysis_failed": True},
+)
+
+
+def _error_response(error_message: str) -> SearchResponseModel:
+    """一般錯誤回應：只有 error_message 隨請求變動"""
+    return SearchResponseModel.model_construct(
+        type="error",
+        message="搜尋過程中發生錯誤，請重新嘗試。",
+        recommendations=[],
+        criteria=None,
+        missing_fields=[],
+        metadata={"error": True, "error_message": error_message},
+    )
+
 @router.post("/search", response_model=SearchResponseModel)
 async def search_restaurants(
     request: SearchRequest,
@@ -27,53 +73,72 @@ async def search_restaurants(
 ):
     """簡化版餐廳搜尋 - 一次性獲取完整參數"""
     user_session = None
+    conn_task = None
 
-    try:
-        # 1. 獲取/創建會話
-        user_session = session_service.get_or_create(request.user_id)
-        logging.info(f"🔍 處理用戶 {request.user_id} 的搜尋請求")
+    # 0. 精確比對快取：位元組相同的請求直接取回完整回應
+    cache_key = AsyncTTLCache.make_key(
+        request.user_id,
+        request.user_input.strip().lower(),
+        request.location,
+        request.time,
+    )
+    cached_response = await response_cache.get(cache_key)
+    if cached_response is not None:
+        return cached_response
 
-        # 2. 智能分析 - 一次性獲取完整參數
+    try:
+        # 1. 智能分析先發出，讓 AI 網路往返與本地前置工作重疊
         context = {
             "location": request.location,
             "time": request.time,
             "user_id": request.user_id
         }
-
-        analysis_result = await ai_service.smart_analyze_user_input(
-            request.user_input,
-            context
+        analysis_task = asyncio.create_task(
+            ai_service.smart_analyze_user_input(request.user_input, context)
+        )
+        # 連接取得也藏進 AI 往返時間裡（池有競爭時可省 1–20 ms）
+        conn_task = asyncio.create_task(
+            restaurant_service.db_restaurant_repo.get_connection()
         )
 
+        # 2. AI 呼叫在途時處理會話與位置解析
+        user_session = session_service.get_or_create(request.user_id)
+        logging.info(f"🔍 處理用戶 {request.user_id} 的搜尋請求")
+        location_data = restaurant_service._process_location_input(request.location)
+
+        analysis_result = await analysis_task
+
         if not analysis_result.get("success", False):
-            return SearchResponseModel(
-                type="error",
-                message="抱歉，無法理解您的需求，請重新描述。",
-                recommendations=[],
-                criteria=None,
-                missing_fields=[],
-                metadata={"analysis_failed": True}
-            )
-
-        # 3. 獲取完整搜尋參數
+            await _discard_connection(restaurant_service, conn_task)
+            return _ANALYSIS_FAILED_RESPONSE
+
+        # 3. 獲取完整搜尋參數（轉成 slots 物件，下游全走屬性讀取）
         search_params = analysis_result["search_params"]
+        sp = SearchParams.from_analysis(search_params)
         confidence = analysis_result.get("confidence", 0.8)
 
         # 4. 記錄會話
         user_session.add_message(MessageRole.USER, request.user_input)
 
-        # 5. 執行搜尋
+        # 5. 執行搜尋。連接所有權自此移交：_execute_smart_search
+        # 之後由它（或 search_restaurants 的 finally）負責歸還，
+        # 先清掉 conn_task，後續任何例外都不可再碰這條連接——
+        # 它可能已回池並被其他請求取走
+        handoff_task, conn_task = conn_task, None
         search_result = await _execute_smart_search(
             restaurant_service,
             request,
-            search_params
+            sp,
+            location_data,
+            handoff_task
         )
 
-        # 6. 生成回應
-        response = await _build_smart_response(
+        # 6. 生成回應（純本地組裝，無 AI 呼叫可重疊，維持同步執行）
+        response = _build_smart_response(
             ai_service,
             restaurant_service,
             search_result,
+            sp,
             search_params,
             request,
             confidence
@@ -82,78 +147,102 @@ async def search_restaurants(
         # 7. 記錄 AI 回應
         user_session.add_message(MessageRole.ASSISTANT, response.message)
 
+        # 8. 成功且信心足夠的回應進快取（錯誤與低信心結果不固定）
+        if response.type in _CACHEABLE_TYPES and confidence >= _CACHE_MIN_CONFIDENCE:
+            await response_cache.put(cache_key, response)
+
         return response
 
     except Exception as e:
-        logger.error(f"搜尋失敗: {str(e)}", exc_info=True)
-        return SearchResponseModel(
-            type="error",
-            message="搜尋過程中發生錯誤，請重新嘗試。",
-            recommendations=[],
-            criteria=None,
-            missing_fields=[],
-            metadata={"error": True, "error_message": str(e)}
-        )
+        logger.error("搜尋失敗: %s", e, exc_info=True)
+        if conn_task is not None:
+            await _discard_connection(restaurant_service, conn_task)
+        return _error_response(str(e))
+
+
+async def _discard_connection(restaurant_service, conn_task: asyncio.Task):
+    """歸還未被搜尋使用（或不再需要）的預取連接"""
+    if conn_task.done() and conn_task.cancelled():
+        return
+    try:
+        conn = await conn_task
+    except Exception:
+        return
+    try:
+        await restaurant_service.db_restaurant_repo.db_manager.pool.release(conn)
+    except Exception as e:
+        logger.warning(f"歸還預取連接失敗: {e}")
 
 async def _execute_smart_search(
     restaurant_service: RestaurantService,
     request: SearchRequest,
-    search_params: dict
+    sp: SearchParams,
+    location_data: dict,
+    conn_task: asyncio.Task
 ) -> dict:
-    """執行智能搜尋"""
+    """執行智能搜尋（使用 AI 呼叫期間預取的資料庫連接）"""
+    conn = None
+    search_started = False
     try:
-        # 處理位置
-        location_data = restaurant_service._process_location_input(request.location)
-
-        # 構建資料庫搜尋參數
+        conn = await conn_task
+        # 構建資料庫搜尋參數（slots 屬性讀取，不經 dict 雜湊）
         db_params = {
             "limit": 20,
-            "cuisine": search_params["cuisine"] if search_params["cuisine"] != "其他" else None,
-            "min_rating": search_params["min_rating"],
+            "cuisine": sp.cuisine if sp.cuisine != "其他" else None,
+            "min_rating": sp.min_rating,
         }
 
         # 價格範圍轉換
-        price_map = {1: "budget", 2: "mid_range", 3: "high_mid", 4: "expensive"}
-        db_params["price_range"] = price_map.get(search_params["price_level"], "mid_range")
+        db_params["price_range"] = _PRICE_MAP.get(sp.price_level, _DEFAULT_PRICE)
 
-        # 位置參數
+        # 位置參數（半徑已在 SearchParams 建構時換算）
         if location_data.get("type") == "coordinates":
             db_params.update({
                 "latitude": location_data["latitude"],
                 "longitude": location_data["longitude"],
-                "radius_km": search_params["radius_meters"] / 1000.0
+                "radius_km": sp.radius_km
             })
         elif location_data.get("type") == "address":
             db_params["address"] = location_data["address"]
-            db_params["radius_km"] = search_params["radius_meters"] / 1000.0
+            db_params["radius_km"] = sp.radius_km
 
-        # 執行搜尋
-        restaurants = await restaurant_service.db_restaurant_repo.search_restaurants(**db_params)
+        # 執行搜尋（search_restaurants 負責歸還連接）
+        search_started = True
+        restaurants = await restaurant_service.db_restaurant_repo.search_restaurants(
+            conn=conn, **db_params
+        )
 
         # 後處理
-        restaurants = restaurant_service._post_process_restaurants(restaurants, location_data)
+        restaurants = restaurant_service._post_process_restaurants(
+            restaurants, location_data
+        )
 
         return {
             "restaurants": restaurants,
-            "search_params": search_params,
             "db_params": db_params,
             "location_data": location_data
         }
 
     except Exception as e:
         logger.error(f"智能搜尋執行失敗: {e}")
+        # 連接已取得但尚未交給 search_restaurants 時，在此歸還
+        if conn is not None and not search_started:
+            try:
+                await restaurant_service.db_restaurant_repo.db_manager.pool.release(conn)
+            except Exception as release_error:
+                logger.warning(f"歸還預取連接失敗: {release_error}")
         return {
             "restaurants": [],
-            "search_params": search_params,
             "db_params": {},
             "location_data": {"type": "none"},
             "error": str(e)
         }
 
-async def _build_smart_response(
+def _build_smart_response(
     ai_service,
     restaurant_service,
     search_result: dict,
+    sp: SearchParams,
     search_params: dict,
     request: SearchRequest,
     confidence: float
@@ -161,38 +250,34 @@ async def _build_smart_response(
     """構建智能回應"""
     restaurants = search_result["restaurants"]
 
-    # 生成個性化訊息
+    # 生成個性化訊息（零結果走預建的罐頭訊息）
     if restaurants:
         if confidence > 0.8:
-            message = f"根據您的需求，為您找到 {len(restaurants)} 家{search_params['cuisine']}餐廳"
+            message = f"根據您的需求，為您找到 {len(restaurants)} 家{sp.cuisine}餐廳"
         else:
             message = f"為您推薦 {len(restaurants)} 家餐廳，如果不符合需求請告訴我更具體的要求"
     else:
-        message = "抱歉，沒有找到符合條件的餐廳。建議您擴大搜尋範圍或調整條件。"
-
-    # 轉換餐廳資料
-    restaurant_responses = []
-    for r in restaurants :
-        try:
-            restaurant_responses.append(r)
-        except Exception as e:
-            logger.warning(f"轉換餐廳資料失敗: {e}")
-            continue
-
-    return SearchResponseModel(
+        message = _NO_RESULTS_MESSAGE
+
+    # 資料庫層已產出型別正確的 Restaurant 物件，直接沿用，
+    # 不需逐筆重建（整體回應已由 model_construct 跳過驗證）
+    restaurant_responses = restaurants
+
+    # 欄位皆來自內部可信資料，使用 model_construct 跳過 Pydantic 驗證
+    return SearchResponseModel.model_construct(
         type="success" if restaurants else "partial",
         message=message,
         recommendations=restaurant_responses,
         criteria={
-            "cuisine": search_params["cuisine"],
-            "radius_meters": search_params["radius_meters"],
-            "price_level": search_params["price_level"],
-            "min_rating": search_params["min_rating"]
+            "cuisine": sp.cuisine,
+            "radius_meters": sp.radius_meters,
+            "price_level": sp.price_level,
+            "min_rating": sp.min_rating
         },
         missing_fields=[],
         metadata={
+            **_STATIC_METADATA,
             "ai_confidence": confidence,
-            "search_completed": True,
             "total_found": len(restaurants),
             "search_params_used": search_params,
             "fallback_used": search_result.get("error") is not None
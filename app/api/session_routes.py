@@ -1,12 +1,15 @@
 # app/api/session_routes.py
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 
 from app.core.dependencies import get_session_service
 from app.services.session_service import SessionService
 
-router = APIRouter(prefix="/session", tags=["session"])
+router = APIRouter(
+    prefix="/session", tags=["session"], default_response_class=ORJSONResponse
+)
 logger = logging.getLogger(__name__)
 
 
@@ -17,25 +20,20 @@ async def get_session_status(
 ):
     """獲取會話狀態"""
     try:
-        user_session = session_service.get_or_create(user_id)
-
-        # 安全地獲取會話狀態
-        is_ready = (
-            user_session.is_fresh_conversation()
-            if hasattr(user_session, "is_fresh_conversation")
-            else True
-        )
-
-        message_count = (
-            user_session.get_message_count()
-            if hasattr(user_session, "get_message_count")
-            else 0
-        )
+        # 唯讀查詢不建立會話，避免監控輪詢堆出大量空會話
+        user_session = session_service.get_if_exists(user_id)
+        if user_session is None:
+            return {
+                "user_id": user_id,
+                "is_ready_for_new_search": True,
+                "message_count": 0,
+                "last_activity": None,
+            }
 
         return {
             "user_id": user_id,
-            "is_ready_for_new_search": is_ready,
-            "message_count": message_count,
+            "is_ready_for_new_search": user_session.is_fresh_conversation(),
+            "message_count": user_session.get_message_count(),
             "last_activity": user_session.updated_at.isoformat(),
         }
     except Exception as e:
@@ -46,20 +44,23 @@ async def get_session_status(
 @router.post("/{user_id}/clear")
 async def clear_session(
     user_id: str,
+    background_tasks: BackgroundTasks,
     session_service: SessionService = Depends(get_session_service),
 ):
     """清除會話"""
     try:
-        user_session = session_service.get_or_create(user_id)
+        user_session = session_service.get_if_exists(user_id)
+        if user_session is None:
+            return {
+                "message": "會話已清除",
+                "cleared_messages": 0,
+                "user_id": user_id,
+            }
 
-        message_count = (
-            user_session.get_message_count()
-            if hasattr(user_session, "get_message_count")
-            else 0
-        )
+        message_count = user_session.get_message_count()
 
-        # 安全地清理會話
-        _cleanup_session(user_session)
+        # 清理移到回應送出後執行，客戶端不必等不會觀察到的工作
+        background_tasks.add_task(_cleanup_session, user_session)
 
         return {
             "message": "會話已清除",
@@ -79,14 +80,11 @@ async def get_session_history(
 ):
     """獲取會話歷史記錄"""
     try:
-        user_session = session_service.get_or_create(user_id)
+        user_session = session_service.get_if_exists(user_id)
+        if user_session is None:
+            return {"user_id": user_id, "history": [], "total_messages": 0}
 
-        # 獲取歷史記錄（如果有此功能）
-        history = (
-            user_session.get_recent_messages(limit)
-            if hasattr(user_session, "get_recent_messages")
-            else []
-        )
+        history = user_session.get_recent_messages(limit)
 
         return {
             "user_id": user_id,
@@ -105,10 +103,10 @@ async def reset_session_criteria(
 ):
     """重置會話搜尋條件（保留歷史記錄）"""
     try:
-        user_session = session_service.get_or_create(user_id)
+        user_session = session_service.get_if_exists(user_id)
 
         # 只重置搜尋條件，保留對話歷史
-        if hasattr(user_session, "reset_search_criteria"):
+        if user_session is not None:
             user_session.reset_search_criteria()
 
         return {
@@ -121,10 +119,5 @@ async def reset_session_criteria(
 
 
 def _cleanup_session(user_session):
-    """清理會話狀態"""
-    if hasattr(user_session, "clear_history"):
-        user_session.clear_history()
-    if hasattr(user_session, "reset_search_criteria"):
-        user_session.reset_search_criteria()
-    if hasattr(user_session, "prepare_for_new_conversation"):
-        user_session.prepare_for_new_conversation()
+    """清理會話狀態（prepare_for_new_conversation 已涵蓋清空與重置）"""
+    user_session.prepare_for_new_conversation()
@@ -7,9 +7,33 @@ class SystemPromptBuilder:
 
     def __init__(self):
         self.templates = PromptTemplateRegistry.get_templates()
+        # 模板的靜態部分（與 kwargs 無關）預先組好，
+        # build_prompt 只剩快取查找加上動態尾段
+        self._compiled: dict = {}
+
+    def invalidate(self, prompt_type: PromptType):
+        """模板被動態修改後，丟棄預組好的靜態字串"""
+        self._compiled.pop(prompt_type, None)
 
     def build_prompt(self, prompt_type: PromptType, **kwargs) -> str:
         """建構指定類型的 System Prompt - 類似 Android 的 build() 方法"""
+        static_prompt = self._compiled.get(prompt_type)
+        if static_prompt is None:
+            static_prompt = self._compile(prompt_type)
+            self._compiled[prompt_type] = static_prompt
+
+        if not kwargs:
+            return static_prompt
+
+        # 添加額外參數（唯一隨呼叫變動的部分）
+        prompt_parts = [static_prompt, "\n額外說明："]
+        for key, value in kwargs.items():
+            prompt_parts.append(f"- {key}: {value}")
+
+        return "\n".join(prompt_parts)
+
+    def _compile(self, prompt_type: PromptType) -> str:
+        """把模板中與 kwargs 無關的段落一次組成字串"""
         template = self.templates.get(prompt_type)
         if not template:
             raise ValueError(f"未支援的 Prompt 類型: {prompt_type}")
@@ -40,12 +64,6 @@ class SystemPromptBuilder:
             for i, example in enumerate(template.examples, 1):
                 prompt_parts.append(f"{i}. {example}")
 
-        # 添加額外參數
-        if kwargs:
-            prompt_parts.append("\n額外說明：")
-            for key, value in kwargs.items():
-                prompt_parts.append(f"- {key}: {value}")
-
         return "\n".join(prompt_parts)
 
     def _add_domain_knowledge(self, prompt_parts: list, domain_knowledge: dict):
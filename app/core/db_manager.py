@@ -1,11 +1,11 @@
 # app/core/database.py
-import asyncio
 import logging
 import os
 from functools import lru_cache
 from typing import Optional
 
 import asyncpg
+import orjson
 
 
 class DatabaseManager:
@@ -14,67 +14,84 @@ class DatabaseManager:
     def __init__(self):
         self.pool: Optional[asyncpg.Pool] = None
 
-    async def init_connection(self, conn):
-        """初始化資料庫連接，包含函數創建"""
-        init_sql = """
-        -- 創建距離計算函數
-        CREATE OR REPLACE FUNCTION calculate_distance(
-            lat1 NUMERIC, lon1 NUMERIC, lat2 NUMERIC, lon2 NUMERIC
-        ) RETURNS NUMERIC AS $$
-        DECLARE
-            earth_radius NUMERIC := 6371; -- 地球半徑（公里）
-            dlat NUMERIC;
-            dlon NUMERIC;
-            a NUMERIC;
-            c NUMERIC;
-        BEGIN
-            -- 檢查輸入參數
-            IF lat1 IS NULL OR lon1 IS NULL OR lat2 IS NULL OR lon2 IS NULL THEN
-                RETURN NULL;
-            END IF;
-
-            -- 轉換為弧度
-            dlat := radians(lat2 - lat1);
-            dlon := radians(lon2 - lon1);
-
-            -- Haversine 公式
-            a := sin(dlat/2) * sin(dlat/2) +
-                 cos(radians(lat1)) * cos(radians(lat2)) *
-                 sin(dlon/2) * sin(dlon/2);
-            c := 2 * asin(sqrt(a));
-
-            -- 返回距離（公里）
-            RETURN earth_radius * c;
-        END;
-        $$ LANGUAGE plpgsql IMMUTABLE;
+    # 一次性遷移 SQL：PostGIS 空間欄位與索引
+    #
+    # 逐列呼叫 PL/pgSQL Haversine 是半徑搜尋在資料庫端的主要
+    # CPU 成本（全表掃描 + 每列 8 次三角函數）。改用 PostGIS
+    # geography 生成欄位 + GiST 索引，讓 ST_DWithin 走 O(log N)
+    # 索引探測。
+    _MIGRATION_SQL = """
+    CREATE EXTENSION IF NOT EXISTS postgis;
+
+    ALTER TABLE restaurants
+        ADD COLUMN IF NOT EXISTS geom geography(Point, 4326)
+        GENERATED ALWAYS AS (
+            ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography
+        ) STORED;
+
+    CREATE INDEX IF NOT EXISTS idx_restaurants_geom
+        ON restaurants USING GIST (geom);
+    """
+
+    # advisory lock 鍵：跨 worker/副本序列化遷移
+    _MIGRATION_LOCK_KEY = 874512
+
+    async def run_migrations(self):
+        """啟動時執行一次的冪等遷移（取代逐連接的 DDL 初始化）
+
+        以 advisory lock 序列化多 worker 同時啟動的情況，
+        免去先前每條新連接重跑 DDL 加重試退避的成本。
         """
-
-        # 添加重試邏輯處理併發更新錯誤
-        max_retries = 3
-        for attempt in range(max_retries):
+        conn = await asyncpg.connect(self._get_database_url())
+        try:
+            await conn.execute(
+                f"SELECT pg_advisory_lock({self._MIGRATION_LOCK_KEY})"
+            )
             try:
-                await conn.execute(init_sql)
-                break
-            except Exception as e:
-                error_msg = str(e).lower()
-                if ("tuple concurrently updated" in error_msg or
-                    "could not serialize access" in error_msg) and attempt < max_retries - 1:
-                    # 指數退避重試
-                    await asyncio.sleep(0.1 * (attempt + 1))
-                    continue
-                raise
+                await conn.execute(self._MIGRATION_SQL)
+            finally:
+                await conn.execute(
+                    f"SELECT pg_advisory_unlock({self._MIGRATION_LOCK_KEY})"
+                )
+            logging.info("✅ 資料庫遷移完成")
+        finally:
+            await conn.close()
+
+    @staticmethod
+    async def _setup_connection(conn):
+        """輕量的逐連接設定：JSON/JSONB 改用 orjson 編解碼
+
+        不同於先前被移除的 DDL 初始化，這裡只註冊編解碼器，
+        不打資料庫，連接建立成本幾乎不變。
+        """
+        for type_name in ("json", "jsonb"):
+            await conn.set_type_codec(
+                type_name,
+                encoder=lambda value: orjson.dumps(value).decode(),
+                decoder=orjson.loads,
+                schema="pg_catalog",
+            )
 
     async def create_pool(self) -> asyncpg.Pool:
-        """創建資料庫連接池"""
+        """創建資料庫連接池（行程內單例，由 get_database_manager 共享）"""
         try:
             database_url = self._get_database_url()
 
             self.pool = await asyncpg.create_pool(
                 database_url,
-                min_size=2,  # 減少初始連接數避免併發問題
-                max_size=10, # 減少最大連接數
+                # 暖池：突發流量不必等連接建立（TCP + auth 約 50ms/條）
+                min_size=10,
+                max_size=50,
+                # 連接輪替與閒置回收，避免長壽連接累積伺服器端狀態
+                max_queries=50_000,
+                max_inactive_connection_lifetime=300,
+                # 搜尋 SQL 是固定骨架，加大語句快取讓 prepared statement
+                # 在連接生命週期內全部命中（asyncpg 以連接為單位快取）
+                statement_cache_size=1024,
                 command_timeout=60,
-                init=self.init_connection,
+                # 短 OLTP 查詢不值得付 PG JIT 的編譯暖機成本
+                server_settings={"jit": "off"},
+                setup=self._setup_connection,
             )
 
             logging.info("✅ 資料庫連接池創建成功")
@@ -84,6 +101,18 @@ class DatabaseManager:
             logging.error(f"❌ 資料庫連接失敗: {e}")
             raise
 
+    def pool_stats(self) -> dict:
+        """連接池使用狀況（供監控端點讀取）"""
+        if self.pool is None:
+            return {"initialized": False}
+        return {
+            "initialized": True,
+            "size": self.pool.get_size(),
+            "idle": self.pool.get_idle_size(),
+            "min_size": self.pool.get_min_size(),
+            "max_size": self.pool.get_max_size(),
+        }
+
     async def close_pool(self):
         """關閉資料庫連接池"""
         if self.pool:
@@ -30,15 +30,18 @@ async def setup_dependencies():
     try:
         config = get_config()
 
-        # 1. 初始化資料庫連接池
+        # 1. 初始化資料庫連接池（遷移只在啟動時跑一次）
         db_manager = get_database_manager()
         if not db_manager.pool:
+            await db_manager.run_migrations()
             await db_manager.create_pool()
             logger.info("✅ 資料庫連接池初始化完成")
         _db_restaurant_repo = DatabaseRestaurantRepository(db_manager)
 
         # 2. 初始化 AI 服務
         _ai_service = GeminiAIService(config.ai)
+        # 啟動意圖分析微批次器（聚合併發請求，減少 Gemini 往返）
+        _ai_service.intent_batcher.start()
         logging.info("✅ AI 服務初始化成功")
 
         # 3. 初始化會話服務
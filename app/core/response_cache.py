@@ -0,0 +1,65 @@
+# app/core/response_cache.py
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class AsyncTTLCache:
+    """非同步安全的 TTL + LRU 快取
+
+    供完整回應的精確比對快取使用：鍵是請求內容的雜湊，
+    命中時 O(1) 取回已構建的回應物件，同時省掉 Gemini
+    分析與資料庫往返。
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts: Any) -> bytes:
+        """把請求欄位組成固定長度的快取鍵"""
+        raw = "|".join(str(part) for part in parts)
+        return hashlib.blake2b(raw.encode(), digest_size=16).digest()
+
+    async def get(self, key: bytes) -> Optional[Any]:
+        async with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, cached_at = entry
+            if time.monotonic() - cached_at >= self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    async def put(self, key: bytes, value: Any) -> None:
+        async with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    async def clear(self) -> None:
+        async with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """命中統計（供監控端點讀取）"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+        }
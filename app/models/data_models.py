@@ -16,7 +16,8 @@ class ChatMessage:
     timestamp: datetime = field(default_factory=datetime.now)
 
 
-@dataclass
+# slots=True：欄位直接以固定位移存取，省掉每個實例的 __dict__ 配置
+@dataclass(slots=True)
 class SearchCriteria:
     """搜尋條件資料實體"""
 
@@ -26,6 +27,16 @@ class SearchCriteria:
     try_new: bool = False
     created_at: str = field(default_factory=lambda: datetime.now().isoformat())
 
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化為 dict（slots 類別沒有 __dict__ 可直接快照）"""
+        return {
+            "radius": self.radius,
+            "cuisine": self.cuisine,
+            "meals": self.meals,
+            "try_new": self.try_new,
+            "created_at": self.created_at,
+        }
+
     def is_complete(self) -> bool:
         return self.radius is not None and self.cuisine is not None
 
@@ -36,3 +47,32 @@ class SearchCriteria:
         if self.cuisine is None:
             missing.append("cuisine")
         return missing
+
+
+# frozen + slots：欄位讀取是 C 層固定位移，不經 dict 雜湊，
+# 且不可變、可雜湊，能直接當快取鍵用
+@dataclass(frozen=True, slots=True)
+class SearchParams:
+    """AI 分析產出的搜尋參數（熱路徑用的固定形狀版本）"""
+
+    cuisine: str
+    radius_meters: int
+    price_level: int
+    min_rating: float
+    try_new: bool = False
+    # 半徑換算在建構時做一次，下游不再重複除法
+    radius_km: float = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "radius_km", self.radius_meters / 1000.0)
+
+    @classmethod
+    def from_analysis(cls, params: Dict[str, Any]) -> "SearchParams":
+        """從 AI 分析結果字典取固定欄位建構（忽略額外欄位）"""
+        return cls(
+            cuisine=params["cuisine"],
+            radius_meters=params["radius_meters"],
+            price_level=params["price_level"],
+            min_rating=params["min_rating"],
+            try_new=params.get("try_new", False),
+        )
@@ -5,7 +5,9 @@ from typing import Any, Dict, List, Optional, Union
 from app.prompts.enums import ResponseType
 
 
-@dataclass
+# slots=True：砍掉每個實例的 __dict__（24 個欄位的模型約省一半記憶體），
+# 欄位讀取成為固定位移存取；搜尋動輒回傳數十列，後處理迴圈直接受惠
+@dataclass(slots=True)
 class Restaurant:
     """餐廳資料模型"""
     restaurant_id: int
@@ -39,7 +41,7 @@ class Restaurant:
 
 
 
-@dataclass
+@dataclass(slots=True)
 class SearchResponse:
     """搜尋回應資料類別"""
 
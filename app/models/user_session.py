@@ -1,9 +1,12 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from datetime import datetime
 from typing import List, Optional
 
 from app.models.data_models import ChatMessage, SearchCriteria
 
+# 搜索條件的合法欄位名（import 時算一次，取代逐鍵 hasattr）
+_CRITERIA_FIELDS = frozenset(f.name for f in fields(SearchCriteria))
+
 
 @dataclass
 class UserSession:
@@ -14,22 +17,34 @@ class UserSession:
     history: List[ChatMessage] = field(default_factory=list)
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
+    # 訊息計數器：隨增刪即時維護，查詢時 O(1)
+    _count: int = field(default=0, init=False, repr=False)
+
+    def __post_init__(self):
+        self._count = len(self.history)
 
     # === 核心訊息操作 ===
     def add_message(self, role: str, content: str):
         """添加訊息到會話歷史"""
         self.history.append(ChatMessage(role=role, content=content))
+        self._count += 1
         self._update_timestamp()
 
     def clear_history(self):
         """清除所有會話歷史"""
         self.history.clear()
+        self._count = 0
         self._update_timestamp()
 
     # === 訊息查詢 ===
+    @property
+    def message_count(self) -> int:
+        """訊息總數（維護中的計數器，不走長度協定）"""
+        return self._count
+
     def get_message_count(self) -> int:
         """獲取訊息總數"""
-        return len(self.history)
+        return self._count
 
     def get_last_messages(self, count: int = 1) -> List[ChatMessage]:
         """獲取最後 N 條訊息"""
@@ -38,11 +53,12 @@ class UserSession:
     def get_recent_messages(self, limit: int = 10) -> List[dict]:
         """獲取最近的 N 條訊息，返回字典格式（適用於API響應）"""
         recent_messages = self.get_last_messages(limit)
+        # ChatMessage 保證有 timestamp 欄位，直接讀屬性即可
         return [
             {
                 "role": msg.role,
                 "content": msg.content,
-                "timestamp": getattr(msg, "timestamp", None),
+                "timestamp": msg.timestamp,
             }
             for msg in recent_messages
         ]
@@ -55,7 +71,7 @@ class UserSession:
     def update_search_criteria(self, **kwargs):
         """更新搜索條件"""
         for key, value in kwargs.items():
-            if hasattr(self.data, key):
+            if key in _CRITERIA_FIELDS:
                 setattr(self.data, key, value)
         self._update_timestamp()
 
@@ -96,6 +112,7 @@ class UserSession:
         self.history = (
             self.history[:-actual_count] if actual_count > 0 else self.history
         )
+        self._count -= actual_count
         self._update_timestamp()
 
         return rolled_back
@@ -108,7 +125,7 @@ class UserSession:
 
         return {
             "user_id": self.user_id,
-            "total_messages": len(self.history),
+            "total_messages": self._count,
             "user_messages": len(user_msgs),
             "assistant_messages": len(assistant_msgs),
             "duration_minutes": self.get_conversation_duration() / 60,
@@ -124,20 +141,18 @@ class UserSession:
         """轉換為字典格式"""
         return {
             "user_id": self.user_id,
-            "data": (
-                self.data.__dict__ if hasattr(self.data, "__dict__") else str(self.data)
-            ),
+            "data": self.data.to_dict(),
             "history": [
                 {
                     "role": msg.role,
                     "content": msg.content,
-                    "timestamp": getattr(msg, "timestamp", None),
+                    "timestamp": msg.timestamp,
                 }
                 for msg in self.history
             ],
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
-            "message_count": len(self.history),
+            "message_count": self._count,
         }
 
     # === 私有輔助方法 ===
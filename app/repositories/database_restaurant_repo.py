@@ -1,16 +1,114 @@
+import time
 from asyncio.log import logger
+from collections import OrderedDict
+from dataclasses import fields
 from typing import Any, Dict, List, Optional
 
 import asyncpg
 
 from app.models.definitions import Restaurant
 
+# Restaurant 的合法欄位名（import 時算一次，供行轉換取交集）
+_RESTAURANT_FIELDS = frozenset(f.name for f in fields(Restaurant))
+
+# 需要強制轉 float 的欄位（Postgres numeric 會以 Decimal 回傳）
+_FLOAT_FIELDS = (
+    "latitude",
+    "longitude",
+    "average_rating",
+    "popularity_score",
+    "distance_km",
+)
+
+# 菜系清單的快取存活時間（秒）：內容以小時為單位才變動
+_CUISINES_CACHE_TTL = 300.0
+
+# 搜尋結果快取：相同條件的重複搜尋直接回傳（容量 / 存活秒數）
+# 鍵是正規化後的參數元組（全部可雜湊），短 TTL 保住資料新鮮度
+_SEARCH_CACHE_SIZE = 256
+_SEARCH_CACHE_TTL = 60.0
+
+# 價格範圍 → ILIKE 樣式（模組載入時建立一次）
+_PRICE_PATTERNS = {
+    "budget": ("%$%", "%budget%", "%cheap%", "%low%"),
+    "mid_range": ("%$$%", "%moderate%", "%mid%", "%medium%"),
+    "high_mid": ("%$$$%", "%expensive%", "%high%"),
+    "expensive": ("%$$$$%", "%luxury%", "%premium%"),
+}
+
+# 固定骨架的搜尋 SQL：未提供的條件以 NULL 參數短路，
+# 任何條件組合都重用同一份語句文字，命中 asyncpg 的
+# prepared-statement 快取（Postgres 免重複解析/規劃）。
+# 有無座標分成兩個骨架，保住 KNN 排序的 GiST 索引路徑。
+_SEARCH_SQL_WITH_COORDS = """
+SELECT *,
+       ST_Distance(
+           geom, ST_SetSRID(ST_MakePoint($1, $2), 4326)::geography
+       ) / 1000.0 AS distance_km
+FROM restaurants
+WHERE ($3::float8 IS NULL
+       OR ST_DWithin(geom, ST_SetSRID(ST_MakePoint($1, $2), 4326)::geography, $3))
+  AND ($4::text IS NULL OR EXISTS (
+          SELECT 1 FROM unnest(cuisine_type) elem
+          WHERE LOWER(elem) LIKE LOWER($4)))
+  AND ($5::text[] IS NULL OR EXISTS (
+          SELECT 1 FROM unnest($5::text[]) pattern
+          WHERE price_range ILIKE pattern))
+  AND ($6::float8 IS NULL OR average_rating >= $6)
+  AND ($7::text IS NULL OR (
+          name ILIKE $7 OR
+          name_en ILIKE $7 OR
+          description ILIKE $7 OR
+          address ILIKE $7 OR
+          district ILIKE $7))
+ORDER BY
+    geom <-> ST_SetSRID(ST_MakePoint($1, $2), 4326)::geography,
+    average_rating DESC NULLS LAST,
+    popularity_score DESC NULLS LAST,
+    total_reviews DESC NULLS LAST
+LIMIT $8
+"""
+
+_SEARCH_SQL_NO_COORDS = """
+SELECT *
+FROM restaurants
+WHERE ($1::text IS NULL OR EXISTS (
+          SELECT 1 FROM unnest(cuisine_type) elem
+          WHERE LOWER(elem) LIKE LOWER($1)))
+  AND ($2::text[] IS NULL OR EXISTS (
+          SELECT 1 FROM unnest($2::text[]) pattern
+          WHERE price_range ILIKE pattern))
+  AND ($3::float8 IS NULL OR average_rating >= $3)
+  AND ($4::text IS NULL OR (
+          name ILIKE $4 OR
+          name_en ILIKE $4 OR
+          description ILIKE $4 OR
+          address ILIKE $4 OR
+          district ILIKE $4))
+  AND ($5::text IS NULL OR (
+          address ILIKE $5 OR
+          district ILIKE $5 OR
+          city ILIKE $5))
+ORDER BY
+    is_featured DESC NULLS LAST,
+    popularity_score DESC NULLS LAST,
+    average_rating DESC NULLS LAST,
+    total_reviews DESC NULLS LAST
+LIMIT $6
+"""
+
 
 class DatabaseRestaurantRepository:
     """資料庫餐廳資料存取層"""
 
     def __init__(self, db_manager):
         self.db_manager = db_manager
+        self._cuisines_cache: Optional[List[str]] = None
+        self._cuisines_cached_at = 0.0
+        # 熱門餐廳結果快取：{limit: (結果, 快取時間)}
+        self._popular_cache: Dict[int, tuple] = {}
+        # 搜尋結果 LRU 快取：{參數元組: (結果, 快取時間)}
+        self._search_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
 
     async def get_connection(self) -> asyncpg.Connection:
         """獲取資料庫連接"""
@@ -29,15 +127,37 @@ class DatabaseRestaurantRepository:
             price_range: Optional[str] = None,
             min_rating: Optional[float] = None,  # 對應 average_rating
             limit: int = 20,
+            conn: Optional[asyncpg.Connection] = None,
             **kwargs
             ) -> List[Restaurant]:
-        """多條件搜尋餐廳"""
-        # SQL 查詢、條件組合、排序、轉換為 Restaurant 物件
-        conn = None
+        """多條件搜尋餐廳
+
+        可傳入預先取得的連接（conn）以隱藏取連接的延遲；
+        無論連接來源為何，本方法都負責歸還。
+        """
+        # 搜尋條件全部可雜湊，直接組成快取鍵；
+        # 命中時整趟 SQL（含取連接）都省掉
+        cache_key = (
+            latitude, longitude, radius_km, address,
+            query, cuisine, price_range, min_rating, limit,
+        )
+        cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            result, cached_at = cached
+            if time.monotonic() - cached_at < _SEARCH_CACHE_TTL:
+                self._search_cache.move_to_end(cache_key)
+                if conn is not None:
+                    await self.db_manager.pool.release(conn)
+                logger.debug("🎯 搜尋結果快取命中: %s", cache_key)
+                # 回傳淺拷貝，呼叫端排序不影響快取內容
+                return list(result)
+            del self._search_cache[cache_key]
+
         try:
-            # 獲取資料庫連接
-            conn = await self.get_connection()
-            logger.info(f"🔍 開始 asyncpg 搜尋: cuisine={cuisine}, price_range={price_range}")
+            # 獲取資料庫連接（未預先提供時才取）
+            if conn is None:
+                conn = await self.get_connection()
+            logger.info("🔍 開始 asyncpg 搜尋: cuisine=%s, price_range=%s", cuisine, price_range)
 
             # 構建 SQL 查詢
             sql_query, params = await self._build_search_query(
@@ -52,28 +172,23 @@ class DatabaseRestaurantRepository:
                 limit=limit
             )
 
-            logger.debug(f"🔄 執行 SQL: {sql_query}")
-            logger.debug(f"📊 參數: {params}")
+            logger.debug("🔄 執行 SQL: %s", sql_query)
+            logger.debug("📊 參數: %s", params)
 
             # 執行查詢
             rows = await conn.fetch(sql_query, *params)
 
-            # 轉換為 Restaurant 對象
+            # 轉換為 Restaurant 對象（欄位交集整批只算一次）
+            restaurants = self._rows_to_restaurants(rows)
 
-            restaurants = []
-            for row in rows:
-                try:
-                    restaurant = self._row_to_restaurant(row)
-                    restaurants.append(restaurant)
-                except Exception as e:
-                    logger.error(f"❌ 轉換資料失敗: {e}")
-                    continue
-
-            logger.info(f"✅ asyncpg 搜尋完成: 找到 {len(restaurants)} 家餐廳")
-            return restaurants
+            logger.info("✅ asyncpg 搜尋完成: 找到 %d 家餐廳", len(restaurants))
+            self._search_cache[cache_key] = (restaurants, time.monotonic())
+            if len(self._search_cache) > _SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+            return list(restaurants)
 
         except Exception as e:
-            logger.error(f"❌ asyncpg 搜尋失敗: {e}", exc_info=True)
+            logger.error("❌ asyncpg 搜尋失敗: %s", e, exc_info=True)
             return []
 
         finally:
@@ -92,123 +207,49 @@ class DatabaseRestaurantRepository:
         min_rating: Optional[float] = None,
         limit: int = 20
     ) -> tuple[str, list]:
-        """構建 PostgreSQL 查詢語句"""
-
-        # 基礎 SELECT 子句
-        select_fields = ["*"]
+        """選擇固定骨架的查詢語句並組參數
 
-        # 如果有座標，計算距離
-        if latitude is not None and longitude is not None:
-            distance_field = f"calculate_distance({latitude}, {longitude}, latitude, longitude) as distance_km"
-            select_fields.append(distance_field)
-
-        select_clause = ", ".join(select_fields)
-
-        # WHERE 條件和參數
-        where_conditions = []
-        params = []
-        param_counter = 1
-
-        # 1. 菜系條件
-        if cuisine and cuisine.strip():
-            where_conditions.append(f"""
-                    AND EXISTS (
-                        SELECT 1 FROM unnest(cuisine_type) elem
-                        WHERE LOWER(elem) LIKE LOWER(${param_counter})
-                    )
-                """)
-            params.append(f"%{cuisine.strip()}%")
-            param_counter += 1
-
-        # 2. 價格範圍
-        if price_range:
-            # 處理價格範圍映射
-            price_mapping = {
-                "budget": ["$", "budget", "cheap", "low"],
-                "mid_range": ["$$", "moderate", "mid", "medium"],
-                "high_mid": ["$$$", "expensive", "high"],
-                "expensive": ["$$$$", "luxury", "premium"]
-            }
-
-            if price_range.lower() in price_mapping:
-                price_options = price_mapping[price_range.lower()]
-                price_conditions = " OR ".join([f"price_range ILIKE ${param_counter + i}" for i in range(len(price_options))])
-                where_conditions.append(f"({price_conditions})")
-                params.extend([f"%{option}%" for option in price_options])
-                param_counter += len(price_options)
-
-        # 3. 評分條件 - 使用 average_rating
-        if min_rating is not None and min_rating > 0:
-            where_conditions.append(f"average_rating >= ${param_counter}")
-            params.append(min_rating)
-            param_counter += 1
-
-        # 4. 文字搜尋 - 搜尋名稱和描述
-        if query and query.strip():
-            search_text = query.strip()
-            text_condition = f"""(
-                name ILIKE ${param_counter} OR
-                name_en ILIKE ${param_counter} OR
-                description ILIKE ${param_counter} OR
-                address ILIKE ${param_counter} OR
-                district ILIKE ${param_counter}
-            )"""
-            where_conditions.append(text_condition)
-            params.append(f"%{search_text}%")
-            param_counter += 1
-
-        # 5. 距離條件
-        if latitude is not None and longitude is not None and radius_km:
-            where_conditions.append(
-                f"calculate_distance({latitude}, {longitude}, latitude, longitude) <= ${param_counter}"
-            )
-            params.append(radius_km)
-            param_counter += 1
-
-        # 6. 地址搜尋
-        elif address and address.strip():
-            address_condition = f"""(
-                address ILIKE ${param_counter} OR
-                district ILIKE ${param_counter} OR
-                city ILIKE ${param_counter}
-            )"""
-            where_conditions.append(address_condition)
-            params.append(f"%{address.strip()}%")
-            param_counter += 1
-
-        # 構建完整查詢
-        where_clause = ""
-        if where_conditions:
-            where_clause = "WHERE 1=1" + " AND ".join(where_conditions)
-
-        # 排序子句
-        if latitude is not None and longitude is not None:
-            order_clause = """ORDER BY
-                distance_km ASC,
-                average_rating DESC NULLS LAST,
-                popularity_score DESC NULLS LAST,
-                total_reviews DESC NULLS LAST"""
-        else:
-            order_clause = """ORDER BY
-                is_featured DESC NULLS LAST,
-                popularity_score DESC NULLS LAST,
-                average_rating DESC NULLS LAST,
-                total_reviews DESC NULLS LAST"""
-
-        # 限制子句
-        limit = min(max(1, limit), 100)
-        limit_clause = f"LIMIT {limit}"
-
-        # 組合完整 SQL
-        sql = f"""
-        SELECT {select_clause}
-        FROM restaurants
-        {where_clause}
-        {order_clause}
-        {limit_clause}
+        語句文字固定（未提供的條件以 NULL 參數短路），
+        所有條件組合共用同一份 prepared statement。
         """
-        return sql.strip(), params
+        cuisine_pattern = (
+            f"%{cuisine.strip()}%" if cuisine and cuisine.strip() else None
+        )
+        price_patterns = (
+            list(_PRICE_PATTERNS[price_range.lower()])
+            if price_range and price_range.lower() in _PRICE_PATTERNS
+            else None
+        )
+        rating = min_rating if min_rating is not None and min_rating > 0 else None
+        query_pattern = f"%{query.strip()}%" if query and query.strip() else None
+        limit = min(max(1, limit), 100)
 
+        if latitude is not None and longitude is not None:
+            radius_m = radius_km * 1000.0 if radius_km else None
+            params = [
+                longitude,
+                latitude,
+                radius_m,
+                cuisine_pattern,
+                price_patterns,
+                rating,
+                query_pattern,
+                limit,
+            ]
+            return _SEARCH_SQL_WITH_COORDS, params
+
+        address_pattern = (
+            f"%{address.strip()}%" if address and address.strip() else None
+        )
+        params = [
+            cuisine_pattern,
+            price_patterns,
+            rating,
+            query_pattern,
+            address_pattern,
+            limit,
+        ]
+        return _SEARCH_SQL_NO_COORDS, params
 
     # # 其他輔助方法
     async def get_restaurant_by_id(self, restaurant_id: int) -> Optional[Restaurant]:
@@ -245,7 +286,14 @@ class DatabaseRestaurantRepository:
                 await self.db_manager.pool.release(conn)
 
     async def get_cuisines(self) -> List[str]:
-        """獲取所有可用的菜系類型"""
+        """獲取所有可用的菜系類型（TTL 快取，省去重複的全表 DISTINCT）"""
+        now = time.monotonic()
+        if (
+            self._cuisines_cache is not None
+            and now - self._cuisines_cached_at < _CUISINES_CACHE_TTL
+        ):
+            return self._cuisines_cache
+
         conn = None
         try:
             conn = await self.get_connection()
@@ -259,7 +307,10 @@ class DatabaseRestaurantRepository:
             ORDER BY cuisine_type
             """
             rows = await conn.fetch(sql)
-            return [row['cuisine_type'] for row in rows]
+            cuisines = [row['cuisine_type'] for row in rows]
+            self._cuisines_cache = cuisines
+            self._cuisines_cached_at = now
+            return cuisines
 
         except Exception as e:
             logger.error(f"❌ 獲取菜系列表失敗: {e}")
@@ -269,49 +320,58 @@ class DatabaseRestaurantRepository:
                 await self.db_manager.pool.release(conn)
 
     async def get_popular_restaurants(self, limit: int = 10) -> List[Restaurant]:
-        """獲取熱門餐廳"""
-        return await self.search_restaurants(limit=limit)  # 默認按人氣排序
+        """獲取熱門餐廳（讀多寫少的聚合，TTL 快取 5 分鐘）"""
+        cached = self._popular_cache.get(limit)
+        if cached is not None and time.monotonic() - cached[1] < _CUISINES_CACHE_TTL:
+            return cached[0]
+
+        restaurants = await self.search_restaurants(limit=limit)  # 默認按人氣排序
+        if restaurants:
+            self._popular_cache[limit] = (restaurants, time.monotonic())
+        return restaurants
 
     async def get_restaurants_by_district(self, district: str, limit: int = 20) -> List[Restaurant]:
         """根據區域獲取餐廳"""
         return await self.search_restaurants(address=district, limit=limit)
 
-    def _row_to_restaurant(self, row) -> Restaurant:
-        """安全的行轉換方法 - 自動填充缺失欄位"""
-        try:
-            # 使用 .get() 方法安全獲取欄位，缺失時使用默認值
-            restaurant = Restaurant(
-                restaurant_id=row.get('restaurant_id'),
-                name=row.get('name') or row.get('restaurant_name') or f"餐廳 {row.get('restaurant_id', 'Unknown')}",
-                name_en=row.get('name_en'),
-                cuisine_type=row.get('cuisine_type'),
-                price_range=row.get('price_range'),
-                phone=row.get('phone'),
-                address=row.get('address'),
-                district=row.get('district'),
-                city=row.get('city'),
-                country=row.get('country'),
-                latitude=float(row['latitude']) if row.get('latitude') is not None else None,
-                longitude=float(row['longitude']) if row.get('longitude') is not None else None,
-                average_rating=float(row['average_rating']) if row.get('average_rating') is not None else None,
-                total_reviews=row.get('total_reviews'),
-                total_visits=row.get('total_visits'),
-                popularity_score=float(row['popularity_score']) if row.get('popularity_score') is not None else None,
-                status=row.get('status'),
-                verified=row.get('verified'),
-                description=row.get('description'),
-                is_featured=row.get('is_featured'),
-                is_sponsored=row.get('is_sponsored'),
-                created_at=row.get('created_at'),
-                updated_at=row.get('updated_at'),
-                distance_km=float(row['distance_km']) if row.get('distance_km') is not None else None
-            )
-            return restaurant
+    def _rows_to_restaurants(self, rows) -> List[Restaurant]:
+        """整批行轉換 - 欄位交集只算一次
 
-        except Exception as e:
-            logger.error(f"❌ 轉換餐廳失敗: {e}")
-            # 返回最基本的餐廳物件
-            return Restaurant(
-                restaurant_id=row.get('restaurant_id'),
-                name=row.get('name', f"餐廳 {row.get('restaurant_id', 'Unknown')}")
-            )
+        同一結果集的所有列共用相同欄位，逐列重跑 24 次
+        row.get() 的防禦式查找是多餘的；先對第一列取
+        欄位名與 Restaurant 欄位的交集，之後每列只做
+        直接索引與必要的 float 正規化。
+        """
+        if not rows:
+            return []
+
+        shared_keys = [
+            key for key in rows[0].keys() if key in _RESTAURANT_FIELDS
+        ]
+        restaurants = []
+        for row in rows:
+            try:
+                data = {key: row[key] for key in shared_keys}
+                for key in _FLOAT_FIELDS:
+                    value = data.get(key)
+                    if value is not None:
+                        data[key] = float(value)
+                if not data.get("name"):
+                    data["name"] = (
+                        row.get("restaurant_name")
+                        or f"餐廳 {data.get('restaurant_id', 'Unknown')}"
+                    )
+                restaurants.append(Restaurant(**data))
+            except Exception as e:
+                logger.error("❌ 轉換餐廳失敗: %s", e)
+                restaurants.append(
+                    Restaurant(
+                        restaurant_id=row.get('restaurant_id'),
+                        name=row.get('name', f"餐廳 {row.get('restaurant_id', 'Unknown')}")
+                    )
+                )
+        return restaurants
+
+    def _row_to_restaurant(self, row) -> Restaurant:
+        """單列轉換（批次路徑的便利包裝）"""
+        return self._rows_to_restaurants([row])[0]
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
 
 from app.models.data_models import SearchCriteria
 from app.models.definitions import Restaurant
@@ -7,53 +9,243 @@ from app.prompts.enums import RestaurantTag
 from app.repositories.interfaces.restaurant_repo_interface import (
     RestaurantRepositoryInterface,
 )
+from shared.utils.geo import GeoUtils
 
 
 class InMemoryRestaurantRepository(RestaurantRepositoryInterface):
     """記憶體餐廳資料庫"""
 
     def __init__(self, restaurants_data: List[Dict[str, Any]]):
+        # 數值欄位在建構時就正規化成 float，之後所有熱迴圈的
+        # 謂詞都可以直接比較，不必逐筆做型別檢查或 or-0 防禦
+        # （欄位對應 Restaurant 模型：cuisine → cuisine_type、
+        # rating → average_rating；tags 模型沒有，另存側表）
         self.restaurants = [
             Restaurant(
-                id=str(idx),
+                restaurant_id=idx,
                 name=r.get("name", ""),
-                cuisine=r.get("cuisine", ""),
-                distance_km=r.get("distance_km", 0),
-                rating=r.get("rating", 0),
-                price_level=r.get("price_level", 1),
-                tags=r.get("tags", []),
-                address=r.get("address"),
+                cuisine_type=r.get("cuisine", ""),
+                price_range=r.get("price_range"),
                 phone=r.get("phone"),
+                address=r.get("address"),
+                latitude=r.get("latitude"),
+                longitude=r.get("longitude"),
+                average_rating=float(r.get("rating") or 0),
                 description=r.get("description"),
+                distance_km=float(r.get("distance_km") or 0),
             )
             for idx, r in enumerate(restaurants_data)
         ]
 
+        # 空間索引：啟動時一次抽出座標平行陣列（缺座標以 NaN 佔位），
+        # 邊界框查詢以向量化比較取代逐筆 Python 掃描
+        count = len(restaurants_data)
+        self._lats = np.fromiter(
+            (r.get("latitude", np.nan) for r in restaurants_data),
+            dtype=np.float64,
+            count=count,
+        )
+        self._lons = np.fromiter(
+            (r.get("longitude", np.nan) for r in restaurants_data),
+            dtype=np.float64,
+            count=count,
+        )
+
+        # 文字搜尋索引：每家餐廳的可搜尋欄位在啟動時串接並轉小寫
+        # 一次，查詢時每筆只剩一個 in 子字串測試
+        self._search_blobs = [
+            " ".join(
+                (
+                    r.get("name", ""),
+                    r.get("cuisine", ""),
+                    r.get("description") or "",
+                    r.get("address") or "",
+                    *(r.get("tags") or ()),
+                )
+            ).lower()
+            for r in restaurants_data
+        ]
+        # 標籤集合：Restaurant 模型沒有 tags 欄位，從原始資料
+        # 另存側表並凍結成 frozenset，標籤測試是 O(1) 雜湊查詢
+        self._tags_sets: Dict[int, frozenset] = {
+            restaurant.restaurant_id: frozenset(r.get("tags") or ())
+            for restaurant, r in zip(self.restaurants, restaurants_data)
+        }
+
+        # 菜系分桶：資料在兩次查詢之間不變，啟動時按菜系分組並
+        # 依 (距離, -評分) 排好序，查詢只掃單一菜系桶、
+        # 距離一超標即可提前結束，免去每次查詢的全量排序。
+        # 桶內存 (建構時距離, 餐廳) 二元組：within_radius 會就地
+        # 改寫 restaurant.distance_km，排序與提前結束必須依據
+        # 這份不可變的快照，否則後續查詢會破壞排序不變量
+        self._by_cuisine: Dict[str, List[Tuple[float, Restaurant]]] = {}
+        for restaurant in self.restaurants:
+            self._by_cuisine.setdefault(restaurant.cuisine_type, []).append(
+                (restaurant.distance_km, restaurant)
+            )
+        for bucket in self._by_cuisine.values():
+            bucket.sort(key=lambda entry: (entry[0], -entry[1].average_rating))
+
+        # 三元組倒排索引：trigram → 含該片段的餐廳索引集合。
+        # 查詢時交集各 trigram 的候選集，把線性全掃描換成
+        # 幾次雜湊查詢加一個極小的驗證迴圈
+        self._trigram_index: Dict[str, set] = {}
+        for idx, blob in enumerate(self._search_blobs):
+            for pos in range(len(blob) - 2):
+                self._trigram_index.setdefault(blob[pos:pos + 3], set()).add(idx)
+
+    def bbox_candidates(
+        self, min_lat: float, max_lat: float, min_lon: float, max_lon: float
+    ) -> List[Restaurant]:
+        """回傳落在邊界框內的候選餐廳（粗篩，不含精確距離檢查）"""
+        mask = (
+            (self._lats >= min_lat) & (self._lats <= max_lat)
+            & (self._lons >= min_lon) & (self._lons <= max_lon)
+        )
+        return [self.restaurants[i] for i in np.nonzero(mask)[0]]
+
+    def filter_by_query(self, query: str) -> List[Restaurant]:
+        """關鍵字搜尋（對預建的小寫搜尋字串做子字串比對）
+
+        欄位串接與轉小寫都在 __init__ 做完，這裡不再逐查詢
+        重建字串，每筆只付一次 C 層的子字串掃描。
+        """
+        query_lower = query.strip().lower()
+        if not query_lower:
+            return []
+
+        # 短查詢（<3 字元）組不出 trigram，退回線性掃描
+        if len(query_lower) < 3:
+            return [
+                self.restaurants[i]
+                for i, blob in enumerate(self._search_blobs)
+                if query_lower in blob
+            ]
+
+        # 交集各 trigram 的候選集；任一 trigram 不存在即可確定無結果
+        candidates: Optional[set] = None
+        for pos in range(len(query_lower) - 2):
+            posting = self._trigram_index.get(query_lower[pos:pos + 3])
+            if not posting:
+                return []
+            candidates = posting if candidates is None else candidates & posting
+            if not candidates:
+                return []
+
+        # trigram 交集只保證片段都出現過，最終仍以連續子字串驗證
+        return [
+            self.restaurants[i]
+            for i in sorted(candidates)
+            if query_lower in self._search_blobs[i]
+        ]
+
+    def within_radius(
+        self, latitude: float, longitude: float, radius_km: float
+    ) -> List[Restaurant]:
+        """回傳半徑內的所有餐廳（向量化批次距離 + 布林遮罩）
+
+        距離以一次向量化呼叫算完全部座標，取代逐筆 Python
+        迴圈呼叫 Haversine；命中的餐廳順便寫入 distance_km。
+        城市級半徑走 cheap-ruler 平面近似（每點只剩乘法與
+        開根號），精度在此尺度下不輸 Haversine。
+        """
+        if not self.restaurants:
+            return []
+
+        # 粗篩-精篩兩段式：先用邊界框的向量化比較刷掉框外的
+        # 大多數座標，只對框內候選做精確距離計算
+        # （NaN 缺座標與任何比較都是 False，自然被遮罩排除）
+        min_lat, max_lat, min_lon, max_lon = GeoUtils.get_bounding_box(
+            latitude, longitude, radius_km
+        )
+        bbox_mask = (
+            (self._lats >= min_lat) & (self._lats <= max_lat)
+            & (self._lons >= min_lon) & (self._lons <= max_lon)
+        )
+        candidates = np.nonzero(bbox_mask)[0]
+        if not candidates.size:
+            return []
+
+        distances = GeoUtils.calculate_distance_cheap_vectorized(
+            latitude, longitude, self._lats[candidates], self._lons[candidates]
+        )
+        within = distances <= radius_km
+        indices = candidates[within]
+        if not indices.size:
+            return []
+
+        hits = distances[within]
+        np.round(hits, 2, out=hits)
+        results = []
+        for i, distance in zip(indices, hits.tolist()):
+            restaurant = self.restaurants[i]
+            restaurant.distance_km = distance
+            results.append(restaurant)
+        return results
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        max_radius_km: Optional[float] = None,
+    ) -> List[Restaurant]:
+        """取得離指定座標最近的 k 家餐廳（可選半徑上限）
+
+        以向量化 Haversine 一次算出全部距離，再用 argpartition
+        選出前 k 名（O(N)），只對這 k 筆做完整排序。
+        """
+        if k <= 0 or not self.restaurants:
+            return []
+
+        distances = GeoUtils.calculate_distance_vectorized(
+            latitude, longitude, self._lats, self._lons
+        )
+        # 缺座標（NaN）視為無限遠
+        distances = np.where(np.isnan(distances), np.inf, distances)
+
+        if k < distances.size:
+            candidate_idx = np.argpartition(distances, k)[:k]
+        else:
+            candidate_idx = np.arange(distances.size)
+
+        # 只對前 k 名排序
+        candidate_idx = candidate_idx[np.argsort(distances[candidate_idx])]
+
+        results = []
+        for i in candidate_idx:
+            if max_radius_km is not None and distances[i] > max_radius_km:
+                break
+            if np.isinf(distances[i]):
+                break
+            results.append(self.restaurants[i])
+        return results
+
     def find_by_criteria(self, criteria: SearchCriteria) -> List[Restaurant]:
-        """根據條件搜尋餐廳"""
+        """根據條件搜尋餐廳
+
+        只掃指定菜系的預排序桶：桶內已按 (距離, -評分) 排好，
+        距離一超過半徑即可提前結束，回傳結果免再排序。
+        """
         if not criteria.radius or not criteria.cuisine:
             return []
 
         distance_km = criteria.radius / 1000
-        results = []
+        wanted_tag = (
+            RestaurantTag.NEW_FLAVOR.value
+            if criteria.try_new
+            else RestaurantTag.CLASSIC.value
+        )
 
-        for restaurant in self.restaurants:
-            # 基本條件篩選
-            if (
-                restaurant.distance_km
-                or 0 <= distance_km
-                and restaurant.cuisine == criteria.cuisine
-            ):
-
-                # 根據 try_new 篩選標籤
-                if criteria.try_new:
-                    if RestaurantTag.NEW_FLAVOR.value in restaurant.tags:
-                        results.append(restaurant)
-                else:
-                    if RestaurantTag.CLASSIC.value in restaurant.tags:
-                        results.append(restaurant)
-
-        return sorted(results, key=lambda x: (x.distance_km, -x.rating))
+        results = []
+        for base_distance, restaurant in self._by_cuisine.get(criteria.cuisine, ()):
+            # 比較建構時的距離快照：restaurant.distance_km 可能已被
+            # 其他查詢（以別的座標）就地覆寫
+            if base_distance > distance_km:
+                break
+            if wanted_tag in self._tags_sets[restaurant.restaurant_id]:
+                results.append(restaurant)
+        return results
 
     def get_by_id(self, restaurant_id: str) -> Optional[Restaurant]:
         """根據 ID 取得餐廳"""
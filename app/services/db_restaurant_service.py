@@ -1,5 +1,6 @@
 # app/services/db_restaurant_service.py
 import logging
+import math
 from typing import Any, Dict, List
 
 from app.models.definitions import Restaurant, SearchResponse
@@ -22,13 +23,15 @@ class DatabaseRestaurantService:
         """後處理餐廳資料"""
         # 如果有座標資訊，重新計算精確距離
         if location_data.get("type") == "coordinates":
-            user_lat = location_data["latitude"]
-            user_lon = location_data["longitude"]
+            # 用戶座標只轉一次弧度，迴圈內不重複轉換
+            user_lat_rad = math.radians(location_data["latitude"])
+            user_lon_rad = math.radians(location_data["longitude"])
 
             for restaurant in restaurants:
                 if restaurant.latitude and restaurant.longitude:
-                    distance = GeoUtils.calculate_distance(
-                        user_lat, user_lon, restaurant.latitude, restaurant.longitude
+                    distance = GeoUtils.calculate_distance_rad(
+                        user_lat_rad, user_lon_rad,
+                        restaurant.latitude, restaurant.longitude,
                     )
                     restaurant.distance_km = round(distance, 2)
 
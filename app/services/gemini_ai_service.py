@@ -1,29 +1,205 @@
-import json
+import asyncio
+import hashlib
+import re
+import time
 from asyncio.log import logger
+from collections import OrderedDict
 from typing import List
 
+import orjson
 from google import genai
 
 from app.builders.prompt_builder import SystemPromptBuilder
 from app.core.setting import AISettings
 from app.prompts.enums import PromptType
 from app.repositories.interfaces.ai_service_interface import AIServiceInterface
+from app.services.helper.ai_batcher import IntentAnalysisBatcher
 from app.services.helper.gemini_api_helper import GeminiAPIHelper
 from app.services.prompt_service import PromptService
+from app.utils.ai_response_utils import (
+    _extract_cuisine_from_input,
+    _extract_radius_from_input,
+)
 from app.utils.response_formatter import ResponseFormatter
 
+# 關鍵字抽取器回傳的菜系代碼 → 搜尋參數使用的菜系名稱
+_CUISINE_LABELS = {
+    "chinese": "中式",
+    "japanese": "日式",
+    "italian": "義式",
+    "sichuan": "川菜",
+    "korean": "韓式",
+    "thai": "泰式",
+    "vietnamese": "越式",
+}
+
+
+def _to_int(value):
+    # LBYL：常見情況（已是 int）走型別快路徑，不經例外機制
+    if type(value) is int:
+        return value
+    if isinstance(value, (str, float)):
+        try:
+            return int(float(value))
+        except ValueError:
+            return None
+    return None
+
+
+def _to_float(value):
+    if type(value) is float:
+        return value
+    if isinstance(value, (str, int)):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _to_bool(value):
+    # 內建 bool() 會把任何非空字串當 True（bool("false") is True），
+    # 字串必須按內容解析；解析不了回傳 None 交由上層保留原值
+    if type(value) is bool:
+        return value
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ("true", "1", "yes"):
+            return True
+        if lowered in ("false", "0", "no"):
+            return False
+        return None
+    if isinstance(value, int):
+        return bool(value)
+    return None
+
+
+def _identity(value):
+    return value
+
+
+# 欄位型別轉換的分派表：模組載入時建立一次，
+# 取代逐欄位 isinstance/if-elif 判斷（AI 回傳的數值常是字串）
+_PARAM_CONVERTERS = {
+    "radius_meters": _to_int,
+    "price_level": _to_int,
+    "min_rating": _to_float,
+    "confidence": _to_float,
+    "try_new": _to_bool,
+    "cuisine": str,
+    "atmosphere": str,
+}
+
+# 超過此長度的回應改到工作執行緒解析，避免卡住事件迴圈
+_PARSE_OFFLOAD_THRESHOLD = 4096
+
+# 意圖快取鍵的正規化：去掉標點與空白差異，
+# 讓「5km 日式!!」「5km 日式」這類近似重複收斂到同一鍵。
+# 半形句點/逗號只在「不是兩側皆數字」時才視為噪音，
+# 否則「1.5km」會被壓成「15km」而撞到錯誤的快取鍵
+_CACHE_KEY_NOISE_RE = re.compile(r"[\s。，！？!?、~～]+|(?<!\d)[.,]|[.,](?!\d)")
+
+
+async def _parse_json_response(response_text: str):
+    """解析模型回應：小回應就地解析，大回應丟到執行緒"""
+    text = response_text.strip()
+    if len(text) > _PARSE_OFFLOAD_THRESHOLD:
+        return await asyncio.to_thread(orjson.loads, text)
+    return orjson.loads(text)
+
 
 class GeminiAIService(AIServiceInterface):
+    # 意圖分析 LRU 快取容量與存活時間（秒）
+    _INTENT_CACHE_SIZE = 512
+    _INTENT_CACHE_TTL = 300.0
+
     def __init__(self, config: AISettings):
         self.config = config
         self.config.validate()
         self.client = genai.Client(api_key=config.api_key)
         self.prompt_service = PromptService(SystemPromptBuilder())
         self.api_helper = GeminiAPIHelper(self.client, ResponseFormatter())
-        logger.info(f"🚀 Gemini AI 服務初始化完成 - 模型: {config.model}")
+        # 意圖分析快取：相同的輸入+位置+時段直接回傳已解析結果，
+        # 省掉整趟 Gemini 網路往返與 JSON 解碼
+        self._intent_cache: "OrderedDict[bytes, dict]" = OrderedDict()
+        self._intent_cache_lock = asyncio.Lock()
+        self._intent_cache_hits = 0
+        self._intent_cache_misses = 0
+        # 併發請求的微批次器（由 setup_dependencies 啟動）
+        self.intent_batcher = IntentAnalysisBatcher(
+            single_call=self._analyze_user_input_uncached,
+            batch_call=self._analyze_user_input_batch,
+        )
+        logger.info("🚀 Gemini AI 服務初始化完成 - 模型: %s", config.model)
+
+    @staticmethod
+    def _intent_cache_key(user_input: str, context: dict) -> bytes:
+        """以 輸入|位置|小時 生成快取鍵（時間只取到小時，同時段共享）
+
+        輸入先做正規化（小寫、去標點與空白）再雜湊，
+        語意相同但表面寫法略異的查詢會命中同一份分析結果。
+        """
+        normalized = _CACHE_KEY_NOISE_RE.sub("", user_input.lower())
+        raw = "|".join(
+            (
+                normalized,
+                str(context.get("location")),
+                str(context.get("time", ""))[:2],
+            )
+        )
+        return hashlib.blake2b(raw.encode(), digest_size=16).digest()
+
+    def intent_cache_stats(self) -> dict:
+        """意圖快取的命中統計（供監控端點讀取）"""
+        total = self._intent_cache_hits + self._intent_cache_misses
+        return {
+            "hits": self._intent_cache_hits,
+            "misses": self._intent_cache_misses,
+            "hit_rate": self._intent_cache_hits / total if total else 0.0,
+            "size": len(self._intent_cache),
+        }
 
     async def smart_analyze_user_input(self, user_input: str, context: dict) -> dict:
         """智能分析用戶輸入，總是回傳完整的搜尋參數"""
+        cache_key = self._intent_cache_key(user_input, context)
+        async with self._intent_cache_lock:
+            cached = self._intent_cache.get(cache_key)
+            if cached is not None:
+                result, cached_at = cached
+                # TTL：過舊的分析結果視同未命中，避免永久固定舊偏好
+                if time.monotonic() - cached_at < self._INTENT_CACHE_TTL:
+                    self._intent_cache.move_to_end(cache_key)
+                    self._intent_cache_hits += 1
+                    logger.debug(
+                        "🎯 意圖分析快取命中 (hits=%d, misses=%d)",
+                        self._intent_cache_hits,
+                        self._intent_cache_misses,
+                    )
+                    return result
+                del self._intent_cache[cache_key]
+            self._intent_cache_misses += 1
+
+        result = await self.intent_batcher.analyze(user_input, context)
+
+        # 低信心、失敗或備用結果不進快取，避免把劣質分析固定下來
+        if (
+            result.get("success")
+            and result.get("confidence", 0) >= 0.5
+            and not result.get("fallback_used")
+        ):
+            async with self._intent_cache_lock:
+                self._intent_cache[cache_key] = (result, time.monotonic())
+                if len(self._intent_cache) > self._INTENT_CACHE_SIZE:
+                    self._intent_cache.popitem(last=False)
+
+        return result
+
+    def invalidate_intent_cache(self):
+        """清空意圖分析快取（模板或模型調整後使用）"""
+        self._intent_cache.clear()
+
+    async def _analyze_user_input_uncached(self, user_input: str, context: dict) -> dict:
+        """實際呼叫 Gemini 的分析流程（快取未命中時）"""
         try:
             # 構建智能分析的 system prompt
             system_prompt = self.prompt_service.build(
@@ -54,53 +230,128 @@ class GeminiAIService(AIServiceInterface):
 
             # 解析 JSON 回應
             try:
-                import json
-                result = json.loads(response_text.strip())
-
-                # 驗證必要欄位
-                required_fields = ['cuisine', 'radius_meters', 'price_level', 'min_rating', 'try_new']
-                for field in required_fields:
-                    if field not in result:
-                        # 補充預設值
-                        defaults = {
-                            'cuisine': '其他',
-                            'radius_meters': 1000,
-                            'price_level': 2,
-                            'min_rating': 3.5,
-                            'try_new': False
-                        }
-                        result[field] = defaults[field]
-
-                logger.info(f"✅ 智能分析成功: {result}")
-                return {
-                    "success": True,
-                    "search_params": result,
-                    "confidence": result.get('confidence', 0.8)
-                }
-
-            except json.JSONDecodeError as e:
-                logger.error(f"❌ JSON 解析失敗: {e}, 原始回應: {response_text}")
+                result = await _parse_json_response(response_text)
+                logger.info("✅ 智能分析成功: %s", result)
+                return self._wrap_search_params(result)
+
+            except orjson.JSONDecodeError as e:
+                logger.error("❌ JSON 解析失敗: %s, 原始回應: %s", e, response_text)
                 # 回傳預設搜尋參數
                 return self._get_fallback_params(user_input)
 
         except Exception as e:
-            logger.error(f"❌ 智能分析失敗: {e}")
+            logger.error("❌ 智能分析失敗: %s", e)
             return self._get_fallback_params(user_input)
 
+    # 必要欄位的預設值（批次與單筆路徑共用）
+    _PARAM_DEFAULTS = {
+        'cuisine': '其他',
+        'radius_meters': 1000,
+        'price_level': 2,
+        'min_rating': 3.5,
+        'try_new': False,
+    }
+
+    def _wrap_search_params(self, result: dict) -> dict:
+        """正規化欄位型別、補齊必要欄位並包裝成統一的分析結果格式"""
+        for key, value in result.items():
+            if value is None:
+                continue
+            converted = _PARAM_CONVERTERS.get(key, _identity)(value)
+            if converted is None:
+                logger.warning("⚠️ 欄位 %s 型別轉換失敗，保留原值: %r", key, value)
+            else:
+                result[key] = converted
+        for field, default in self._PARAM_DEFAULTS.items():
+            if field not in result:
+                result[field] = default
+        return {
+            "success": True,
+            "search_params": result,
+            "confidence": result.get('confidence', 0.8),
+        }
+
+    async def _analyze_user_input_batch(self, items: list) -> list:
+        """把多筆併發的分析請求合併為一次 Gemini 呼叫
+
+        items 為 (user_input, context) 序列。提示詞以「## REQ n」編號
+        各請求，要求模型回傳等長的 JSON 陣列；解析失敗時回傳 None，
+        由批次器退回逐筆呼叫。
+        """
+        # system prompt 不帶任何單一請求的 context：批次裡每個用戶的
+        # 時間與位置都在各自的 REQ 區段內，若把第一筆的 context 塞進
+        # 共用提示詞，模型會拿用戶 1 的位置去分析其他人的需求
+        system_prompt = self.prompt_service.build(
+            PromptType.SMART_RESTAURANT_ANALYSIS
+        )
+
+        sections = []
+        for i, (user_input, context) in enumerate(items, 1):
+            sections.append(
+                f"## REQ {i}\n"
+                f"用戶需求: \"{user_input}\"\n"
+                f"當前時間: {context.get('time', '18:00')}\n"
+                f"位置資訊: {context.get('location', '未指定')}"
+            )
+
+        batched_message = (
+            "以下是多筆獨立的用戶需求，請分別分析，"
+            "並以 JSON 陣列回傳（依 REQ 編號排序，每筆一個物件）：\n\n"
+            + "\n\n".join(sections)
+        )
+
+        response_text = await self.api_helper.call_api(
+            client=self.client,
+            model=self.config.model,
+            system_prompt=system_prompt,
+            user_message=batched_message,
+            temperature=0.1,
+            max_tokens=self.config.max_tokens,
+            top_p=self.config.top_p,
+            top_k=self.config.top_k,
+        )
+
+        try:
+            parsed = await _parse_json_response(response_text)
+        except orjson.JSONDecodeError as e:
+            logger.warning("⚠️ 批次分析 JSON 解析失敗: %s", e)
+            return None
+
+        if not isinstance(parsed, list) or len(parsed) != len(items):
+            logger.warning(
+                "⚠️ 批次分析結果數量不符: 預期 %d，實際 %s",
+                len(items),
+                len(parsed) if isinstance(parsed, list) else type(parsed),
+            )
+            return None
+
+        return [self._wrap_search_params(result) for result in parsed]
+
     def _get_fallback_params(self, user_input: str) -> dict:
-        """當 AI 分析失敗時的備用參數"""
+        """當 AI 分析失敗時的備用參數
+
+        先用本地關鍵字掃描從輸入裡撈出半徑與菜系，
+        撈得到就不必退到全預設值。
+        """
+        radius_meters = _extract_radius_from_input(user_input) or 1000
+        cuisine = _CUISINE_LABELS.get(
+            _extract_cuisine_from_input(user_input), "其他"
+        )
+        # 兩項都從輸入取得時，本地解析的可信度高於純預設值
+        confidence = 0.5 if (radius_meters != 1000 and cuisine != "其他") else 0.3
+
         return {
             "success": True,
             "search_params": {
-                "cuisine": "其他",
-                "radius_meters": 1000,
+                "cuisine": cuisine,
+                "radius_meters": radius_meters,
                 "price_level": 2,
                 "min_rating": 3.5,
                 "try_new": False,
                 "dietary_requirements": [],
                 "atmosphere": "",
-                "confidence": 0.3
+                "confidence": confidence
             },
-            "confidence": 0.3,
+            "confidence": confidence,
             "fallback_used": True
         }
@@ -0,0 +1,122 @@
+# app/services/helper/ai_batcher.py
+"""意圖分析微批次器
+
+高併發時多個 /search 請求各自打一趟 Gemini，白白付出 N 倍網路往返。
+這裡用 asyncio.Queue 聚合 20 毫秒窗口內到達的分析請求，合併成
+單一編號提示詞一次送出，再把結果拆回各個等待中的協程。
+批次解析失敗時退回逐筆呼叫，行為與未批次時一致。
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 單批最多聚合的請求數與收集窗口（秒）
+MAX_BATCH_SIZE = 8
+BATCH_WINDOW_SECONDS = 0.02
+
+# (user_input, context, 回傳結果的 future)
+_QueueItem = Tuple[str, dict, "asyncio.Future[dict]"]
+
+
+class IntentAnalysisBatcher:
+    """聚合併發的意圖分析請求，減少 Gemini HTTP 往返次數"""
+
+    def __init__(
+        self,
+        single_call: Callable[[str, dict], Awaitable[dict]],
+        batch_call: Callable[[List[Tuple[str, dict]]], Awaitable[Optional[List[dict]]]],
+        max_batch_size: int = MAX_BATCH_SIZE,
+        window_seconds: float = BATCH_WINDOW_SECONDS,
+    ):
+        self._single_call = single_call
+        self._batch_call = batch_call
+        self._max_batch_size = max_batch_size
+        self._window_seconds = window_seconds
+        self._queue: "asyncio.Queue[_QueueItem]" = asyncio.Queue()
+        self._consumer_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """啟動消費者任務（應在事件迴圈內呼叫，例如 setup_dependencies）"""
+        if self._consumer_task is None or self._consumer_task.done():
+            self._consumer_task = asyncio.create_task(self._consume())
+            logger.info("🚌 意圖分析批次器已啟動")
+
+    async def stop(self):
+        """停止消費者任務"""
+        if self._consumer_task is not None:
+            self._consumer_task.cancel()
+            try:
+                await self._consumer_task
+            except asyncio.CancelledError:
+                pass
+            self._consumer_task = None
+
+    async def analyze(self, user_input: str, context: dict) -> dict:
+        """排入佇列並等待批次結果；批次器未啟動時直接單筆呼叫"""
+        if self._consumer_task is None or self._consumer_task.done():
+            return await self._single_call(user_input, context)
+
+        future: "asyncio.Future[dict]" = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((user_input, context, future))
+        return await future
+
+    async def _consume(self):
+        while True:
+            batch = [await self._queue.get()]
+
+            # 在窗口內繼續收集，湊滿上限或逾時為止
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self._window_seconds
+            while len(batch) < self._max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            await self._dispatch(batch)
+
+    async def _dispatch(self, batch: List[_QueueItem]):
+        """執行一個批次並把結果回填到各 future"""
+        if len(batch) == 1:
+            user_input, context, future = batch[0]
+            await self._resolve_single(user_input, context, future)
+            return
+
+        try:
+            results = await self._batch_call(
+                [(user_input, context) for user_input, context, _ in batch]
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ 批次意圖分析失敗，退回逐筆呼叫: {e}")
+            results = None
+
+        if results is not None and len(results) == len(batch):
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            return
+
+        # 批次結果不可用：逐筆並行退回單一呼叫
+        await asyncio.gather(
+            *(
+                self._resolve_single(user_input, context, future)
+                for user_input, context, future in batch
+            )
+        )
+
+    async def _resolve_single(self, user_input: str, context: dict, future):
+        try:
+            result = await self._single_call(user_input, context)
+            if not future.done():
+                future.set_result(result)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
@@ -1,4 +1,5 @@
-from typing import Any, Dict, List
+import asyncio
+from typing import Any, Dict, List, Tuple
 
 from google.genai import types
 
@@ -6,18 +7,35 @@ from app.models.data_models import ChatMessage
 from app.prompts.enums import MessageRole
 from shared.utils.exceptions import AIServiceError
 
+# 同時在途的 Gemini 請求上限，避免突發流量打爆配額
+_MAX_CONCURRENT_CALLS = 8
+
 
 class GeminiAPIHelper:
     def __init__(self, client, response_formatter):
         self.client = client
         self.response_formatter = response_formatter
+        self._call_semaphore = asyncio.Semaphore(_MAX_CONCURRENT_CALLS)
+
+    def convert_messages(
+        self, messages: List[ChatMessage]
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """轉換訊息為 Gemini contents 格式，順便記下最後一則用戶訊息
 
-    def convert_messages(self, messages: List[ChatMessage]) -> List[Dict[str, Any]]:
+        轉換時本來就逐則走訪，最後的用戶文字在這裡一併取得，
+        呼叫端不必再對巢狀 dict/list 反向索引。
+        """
         role_map = {MessageRole.SYSTEM: "model", MessageRole.ASSISTANT: "model", MessageRole.USER: "user"}
-        return [
-            {"role": role_map.get(msg.role, "user"), "parts": [{"text": msg.content}]}
-            for msg in messages if msg.role != MessageRole.SYSTEM
-        ]
+        contents: List[Dict[str, Any]] = []
+        last_user_text = ""
+        for msg in messages:
+            if msg.role == MessageRole.SYSTEM:
+                continue
+            role = role_map.get(msg.role, "user")
+            contents.append({"role": role, "parts": [{"text": msg.content}]})
+            if role == "user":
+                last_user_text = msg.content
+        return contents, last_user_text
 
     async def call_api(
         self, client, model: str, system_prompt: str, user_message: str, temperature: float, max_tokens: int, top_p: float, top_k: int
@@ -29,8 +47,16 @@ class GeminiAPIHelper:
             max_output_tokens=max_tokens,
             top_p=top_p,
             top_k=top_k,
+            # 結構化輸出：模型直接回傳純 JSON，不再夾帶
+            # markdown 代碼塊，下游的圍欄清理與解析失敗分支都省了
+            response_mime_type="application/json",
         )
-        response = self.client.models.generate_content(model=model, config=config, contents=contents)
+        # 走 client.aio 的原生 async 介面：先前的同步呼叫會
+        # 整段網路往返期間卡住事件迴圈，所有併發請求跟著排隊
+        async with self._call_semaphore:
+            response = await self.client.aio.models.generate_content(
+                model=model, config=config, contents=contents
+            )
         if not response or not response.text:
             raise AIServiceError("AI 回應為空")
-        return self.response_formatter.clean_json_response(response.text.strip())
+        return response.text
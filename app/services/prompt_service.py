@@ -1,27 +1,47 @@
+import dataclasses
 import logging
-from typing import Any
+from functools import lru_cache
+from typing import Any, Tuple
 
 from app.builders.prompt_builder import SystemPromptBuilder
+from app.models.prompt_template import PromptTemplate
 from app.prompts.enums import PromptType
 
 logger = logging.getLogger(__name__)
 
+# 模板的合法欄位名：import 時算一次，更新時用 in 檢查
+# 取代逐鍵 hasattr（完整屬性查找 + 例外攔截）
+_TEMPLATE_FIELDS = frozenset(f.name for f in dataclasses.fields(PromptTemplate))
+
 class PromptService:
     """封裝 Prompt 生成功能"""
 
     def __init__(self, builder: SystemPromptBuilder):
         self.builder = builder
+        # 模板在兩次編輯之間是靜態的，組字串結果可直接記憶化；
+        # update_template 時整批失效
+        self._build_cached = lru_cache(maxsize=256)(self._build_uncached)
 
     def build(self, prompt_type: PromptType, **kwargs) -> str:
         """
         根據 PromptType 和可選參數生成 Prompt。
         """
         try:
-            return self.builder.build_prompt(prompt_type, **kwargs)
+            # kwargs 值在 prompt 裡本來就以字串形式呈現，
+            # 先字串化使鍵可雜湊（例如座標物件）
+            kwargs_items = tuple(
+                sorted((key, str(value)) for key, value in kwargs.items())
+            )
+            return self._build_cached(prompt_type, kwargs_items)
         except Exception as e:
             logger.error(f"❌ 生成 Prompt 失敗: {e}")
             return f"無法生成 Prompt: {e}"
 
+    def _build_uncached(
+        self, prompt_type: PromptType, kwargs_items: Tuple[Tuple[str, str], ...]
+    ) -> str:
+        return self.builder.build_prompt(prompt_type, **dict(kwargs_items))
+
 
     def update_template(self, prompt_type: PromptType, **updates):
         """
@@ -31,8 +51,11 @@ class PromptService:
             template = self.builder.templates.get(prompt_type)
             if template:
                 for key, value in updates.items():
-                    if hasattr(template, key):
+                    if key in _TEMPLATE_FIELDS:
                         setattr(template, key, value)
+                # 模板變更後舊的組字串結果全部作廢
+                self._build_cached.cache_clear()
+                self.builder.invalidate(prompt_type)
                 logger.info(f"📝 更新 Prompt 模板: {prompt_type.value}")
             else:
                 logger.warning(f"未找到 Prompt 模板: {prompt_type.value}")
@@ -1,14 +1,27 @@
 import logging
+import math
 from asyncio.log import logger
 from datetime import datetime
+from operator import attrgetter
 from typing import Any, Dict, List, Optional, Union
 
+import numpy as np
+import orjson
+
 from app.models.definitions import Restaurant, SearchResponse
+
+# C 層的屬性讀取器：排序比較時不經 Python 呼叫框架
+_DISTANCE_KEY = attrgetter("distance_km")
 from app.models.requests import LocationCoordinates
 from app.prompts.enums import ResponseType
 from shared.utils.geo import GeoUtils
 
 
+# 結果數低於此門檻時，NumPy 陣列建構的固定成本反而超過
+# 純量迴圈（典型搜尋 limit=20，小批次其實是常態）
+_VECTORIZE_THRESHOLD = 32
+
+
 class RestaurantService:
     """餐廳服務主類別"""
 
@@ -85,18 +98,20 @@ class RestaurantService:
     def _parse_ai_analysis(
         self, ai_analysis: Optional[str], user_input: str
     ) -> Dict[str, Any]:
-        """解析 AI 分析結果"""
+        """解析 AI 分析結果
+
+        先偷看第一個非空白字元：明顯不是 JSON 的輸入直接跳過，
+        不走例外機制；確定像 JSON 才交給 orjson 解析。
+        """
         search_params = {"user_input": user_input}
 
-        if ai_analysis:
+        if ai_analysis and ai_analysis.lstrip()[:1] in ("{", "["):
             try:
-                import json
-
-                ai_data = json.loads(ai_analysis)
+                ai_data = orjson.loads(ai_analysis)
                 if isinstance(ai_data, dict):
                     search_params.update(ai_data)
-            except Exception as e:
-                logging.warning(f"AI 分析結果解析失敗: {e}")
+            except orjson.JSONDecodeError as e:
+                logging.warning("AI 分析結果解析失敗: %s", e)
 
         return search_params
 
@@ -170,7 +185,9 @@ class RestaurantService:
         )
 
     def _post_process_restaurants(
-        self, restaurants: List[Restaurant], location_data: Dict[str, Any]
+        self,
+        restaurants: List[Restaurant],
+        location_data: Dict[str, Any],
     ) -> List[Restaurant]:
         """後處理餐廳資料：計算距離和排序"""
         if location_data.get("type") == "coordinates":
@@ -178,31 +195,115 @@ class RestaurantService:
             # restaurants = self._sort_by_distance(restaurants)
         return restaurants
 
+    @staticmethod
+    def _coords_arrays(restaurants: List[Restaurant]) -> tuple:
+        """把餐廳座標一次抽取成 SoA 平行陣列（缺座標以 NaN 佔位）
+
+        後續的邊界框粗篩和距離計算都直接在陣列上運算，
+        避免在 Python 迴圈中反覆做物件屬性存取。
+        """
+        count = len(restaurants)
+        lats = np.fromiter(
+            (r.latitude if r.latitude is not None else np.nan for r in restaurants),
+            dtype=np.float64,
+            count=count,
+        )
+        lons = np.fromiter(
+            (r.longitude if r.longitude is not None else np.nan for r in restaurants),
+            dtype=np.float64,
+            count=count,
+        )
+        return lats, lons
+
     def _calculate_distances(
-        self, restaurants: List[Restaurant], location_data: Dict[str, Any]
+        self,
+        restaurants: List[Restaurant],
+        location_data: Dict[str, Any],
     ) -> List[Restaurant]:
-        """計算餐廳距離"""
+        """計算餐廳距離（向量化批次計算）"""
+        if not restaurants:
+            return restaurants
+
         user_lat = location_data.get("latitude", 0)
         user_lon = location_data.get("longitude", 0)
 
+        # SQL 以 ST_Distance 算好的距離保留數值但統一捨入到
+        # 小數兩位，與本地計算的輸出格式一致
         for restaurant in restaurants:
-            if hasattr(restaurant, "latitude") and hasattr(restaurant, "longitude"):
-                if restaurant.latitude is not None and restaurant.longitude is not None:
-                    distance = GeoUtils.calculate_distance(
-                        user_lat, user_lon, restaurant.latitude, restaurant.longitude
-                    )
-                    restaurant.distance_km = round(distance, 2)
-                else:
-                    restaurant.distance_km = 0
+            if restaurant.distance_km is not None:
+                restaurant.distance_km = round(restaurant.distance_km, 2)
+
+        # 小批次走純量迴圈：省掉陣列建構與遮罩運算的固定成本
+        if len(restaurants) < _VECTORIZE_THRESHOLD:
+            return self._calculate_distances_scalar(restaurants, user_lat, user_lon)
+
+        # 座標搜尋的 SQL 已用 ST_Distance 算好 distance_km，
+        # 這裡只補缺值，不重複整批三角函數運算
+        needs_distance = np.fromiter(
+            (r.distance_km is None for r in restaurants),
+            dtype=bool,
+            count=len(restaurants),
+        )
+        if not needs_distance.any():
+            return restaurants
+
+        # AoS → SoA：座標抽取一次，之後全部走陣列運算。
+        # 缺距離的每一筆都要補值，不做邊界框粗篩——被篩掉的筆
+        # 會帶著 None 流出去
+        lats, lons = self._coords_arrays(restaurants)
+        has_coords = ~(np.isnan(lats) | np.isnan(lons))
+        compute_mask = has_coords & needs_distance
+
+        indices = np.nonzero(compute_mask)[0]
+        if indices.size:
+            distances = GeoUtils.calculate_distance_vectorized(
+                user_lat, user_lon, lats[indices], lons[indices]
+            )
+            # 一次在陣列上完成捨入，省去 N 次 Python round 呼叫
+            np.round(distances, 2, out=distances)
+            for idx, distance in zip(indices, distances.tolist()):
+                restaurants[idx].distance_km = distance
+
+        # 缺少座標又無既有距離的餐廳補上預設值
+        for idx in np.nonzero(~has_coords & needs_distance)[0]:
+            restaurants[idx].distance_km = 0
 
         return restaurants
 
+    @staticmethod
+    def _calculate_distances_scalar(
+        restaurants: List[Restaurant], user_lat: float, user_lon: float
+    ) -> List[Restaurant]:
+        """小批次的純量距離計算（用戶座標只轉一次弧度）"""
+        user_lat_rad = math.radians(user_lat)
+        user_lon_rad = math.radians(user_lon)
+        for restaurant in restaurants:
+            if restaurant.distance_km is not None:
+                continue
+            if restaurant.latitude is None or restaurant.longitude is None:
+                restaurant.distance_km = 0
+                continue
+            restaurant.distance_km = round(
+                GeoUtils.calculate_distance_rad(
+                    user_lat_rad,
+                    user_lon_rad,
+                    restaurant.latitude,
+                    restaurant.longitude,
+                ),
+                2,
+            )
+        return restaurants
+
     def _sort_by_distance(self, restaurants: List[Restaurant]) -> List[Restaurant]:
-        """按距離排序"""
-        return sorted(
-            restaurants,
-            key=lambda r: r.distance_km if r.distance_km is not None else float("inf"),
-        )
+        """按距離排序
+
+        先把缺距離的筆數一次補成 inf，排序鍵就能用 C 實作的
+        attrgetter，省去每次比較的 Python lambda 呼叫框架。
+        """
+        for restaurant in restaurants:
+            if restaurant.distance_km is None:
+                restaurant.distance_km = float("inf")
+        return sorted(restaurants, key=_DISTANCE_KEY)
 
 
 
@@ -18,6 +18,10 @@ class SessionService:
         self.logger = logging.getLogger(__name__)
 
     # === 核心會話操作 ===
+    def get_if_exists(self, user_id: str) -> Optional[UserSession]:
+        """獲取用戶會話，不存在時不建立（唯讀查詢用）"""
+        return self.repo.get(user_id)
+
     def get_or_create(self, user_id: str) -> UserSession:
         """獲取或創建用戶會話"""
         session = self.repo.get(user_id)
@@ -1,10 +1,63 @@
 # ai_response_utils.py
-import json
 import re
-from typing import Any, Dict, List
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional
+
+import orjson
 
 from app.utils.response_formatter import ResponseFormatter
 
+# 菜系關鍵字表：模組載入時建立一次並凍結，
+# 反向索引（別名 → 標準代碼）提供 O(1) 查詢
+_CUISINE_KEYWORDS = MappingProxyType({
+    "chinese": ("中式", "中菜", "chinese", "中國菜", "中餐"),
+    "japanese": ("日式", "日菜", "japanese", "日本菜", "日餐"),
+    "italian": ("義式", "義大利", "italian", "義大利菜", "意大利"),
+    "sichuan": ("川菜", "sichuan", "四川菜", "川式"),
+    "korean": ("韓式", "韓菜", "korean", "韓國菜", "韓餐"),
+    "thai": ("泰式", "泰菜", "thai", "泰國菜", "泰餐"),
+    "vietnamese": ("越式", "越菜", "vietnamese", "越南菜", "越餐"),
+})
+
+_CUISINE_ALIAS_INDEX = MappingProxyType({
+    alias: cuisine_type
+    for cuisine_type, aliases in _CUISINE_KEYWORDS.items()
+    for alias in aliases
+})
+
+# 熱路徑用的正則在 import 時編譯一次，
+# 免去每次呼叫經過 re 模組快取查找與參數解析
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_RATING_RE = re.compile(r"評分.*?(\d+(?:\.\d+)?)")
+
+# 關鍵字表編成單一選擇式正則 + 關鍵字→類別對照表：
+# 原本的巢狀 any(k in text) 是 O(關鍵字數 × 輸入長度) 的
+# 逐關鍵字子字串掃描，改成一次 search 掃描輸入即可
+_CUISINE_RE = re.compile(
+    "|".join(re.escape(alias) for alias in _CUISINE_ALIAS_INDEX)
+)
+
+_PRICE_KEYWORDS = MappingProxyType({
+    "budget": ("便宜", "實惠", "cheap", "budget", "省錢"),
+    "mid_range": ("中等", "一般", "moderate", "中價"),
+    "expensive": ("高檔", "昂貴", "expensive", "奢華", "高級"),
+})
+
+_PRICE_ALIAS_INDEX = MappingProxyType({
+    keyword: level
+    for level, keywords in _PRICE_KEYWORDS.items()
+    for keyword in keywords
+})
+
+_PRICE_RE = re.compile(
+    "|".join(re.escape(keyword) for keyword in _PRICE_ALIAS_INDEX)
+)
+
+# 嘗新偏好：肯定詞優先於否定詞（維持原本的判斷順序）
+_TRY_NEW_RE = re.compile("新|new|嘗試|新鮮")
+_TRY_FAMILIAR_RE = re.compile("熟悉|familiar|經典|傳統")
+
 
 def analyze_user_input(user_input: str, session_data: Dict) -> Dict[str, Any]:
     """分析用戶輸入並返回 AI 回應
@@ -21,63 +74,106 @@ def analyze_user_input(user_input: str, session_data: Dict) -> Dict[str, Any]:
     session_data.setdefault("collected_info", {})
     collected_info = session_data["collected_info"]
 
+    # 關鍵字掃描對 (輸入, 已收集狀態) 是純函式：凍結狀態成
+    # 可雜湊元組後交給 LRU 快取層，重送/重試同樣輸入時
+    # 整套正則與關鍵字掃描直接跳過
+    is_complete, message, missing_fields, collected_items = _analyze_cached(
+        user_input, tuple(sorted(collected_info.items()))
+    )
+
+    # 把快取層算出的新狀態合併回會話（快取值本身不可變，不會被污染）
+    collected_info.update(collected_items)
+
+    result: Dict[str, Any] = {
+        "is_complete": is_complete,
+        "message": message,
+        "missing_fields": list(missing_fields),
+    }
+    if is_complete:
+        result["search_params"] = collected_info
+    return result
+
+
+@lru_cache(maxsize=4096)
+def _analyze_cached(user_input: str, collected_items: tuple) -> tuple:
+    """純函式的分析核心（可記憶化）
+
+    回傳 (is_complete, message, missing_fields, collected_items)，
+    全部為不可變型別，可安全地被多個呼叫共享。
+    """
+    collected = dict(collected_items)
+
+    # 小寫化整個分析流程只做一次，各 helper 重用同一份副本
+    user_input_lower = user_input.lower()
+
     # 檢查距離信息
-    if "radius" not in collected_info:
-        radius = _extract_radius_from_input(user_input)
+    if "radius" not in collected:
+        radius = _extract_radius_from_input(user_input, user_input_lower)
         if radius:
-            collected_info["radius"] = radius
+            collected["radius"] = radius
         else:
-            return {
-                "is_complete": False,
-                "message": "請問您希望搜索多大範圍內的餐廳？(例如: 5 km)",
-                "missing_fields": ["radius"],
-            }
+            return (
+                False,
+                "請問您希望搜索多大範圍內的餐廳？(例如: 5 km)",
+                ("radius",),
+                tuple(sorted(collected.items())),
+            )
 
     # 檢查菜系信息
-    if "cuisine" not in collected_info:
-        cuisine = _extract_cuisine_from_input(user_input)
+    if "cuisine" not in collected:
+        cuisine = _extract_cuisine_from_input(user_input, user_input_lower)
         if cuisine:
-            collected_info["cuisine"] = cuisine
+            collected["cuisine"] = cuisine
         else:
-            return {
-                "is_complete": False,
-                "message": "菜系名稱？",
-                "missing_fields": ["cuisine"],
-            }
+            return (
+                False,
+                "菜系名稱？",
+                ("cuisine",),
+                tuple(sorted(collected.items())),
+            )
 
     # 檢查其他可選參數
-    _extract_optional_params(user_input, collected_info)
+    _extract_optional_params(user_input, collected, user_input_lower)
 
     # 如果信息收集完成，生成最終結果
-    if _is_collection_complete(collected_info):
-        return {
-            "is_complete": True,
-            "message": _generate_final_json_message(collected_info),
-            "missing_fields": [],
-            "search_params": collected_info,
-        }
+    if _is_collection_complete(collected):
+        return (
+            True,
+            _generate_final_json_message(collected),
+            (),
+            tuple(sorted(collected.items())),
+        )
 
     # 確定還需要什麼信息
-    missing_fields = _get_missing_required_fields(collected_info)
-    return {
-        "is_complete": False,
-        "message": _generate_question_for_missing_field(missing_fields[0]),
-        "missing_fields": missing_fields,
-    }
+    missing_fields = tuple(_get_missing_required_fields(collected))
+    return (
+        False,
+        _generate_question_for_missing_field(missing_fields[0]),
+        missing_fields,
+        tuple(sorted(collected.items())),
+    )
 
 
-def _extract_radius_from_input(user_input: str) -> int:
-    """從用戶輸入中提取距離信息"""
+def _extract_radius_from_input(
+    user_input: str, user_input_lower: Optional[str] = None
+) -> int:
+    """從用戶輸入中提取距離信息
+
+    呼叫端若已有小寫副本可直接傳入，避免重複 lower() 配置。
+    """
+    if user_input_lower is None:
+        user_input_lower = user_input.lower()
     distance_keywords = ["km", "公里", "kilometer", "meter", "米", "m"]
 
-    if any(keyword in user_input.lower() for keyword in distance_keywords):
-        # 提取數字
-        numbers = re.findall(r"\d+(?:\.\d+)?", user_input)
-        if numbers:
-            distance = float(numbers[0])
+    if any(keyword in user_input_lower for keyword in distance_keywords):
+        # 只需要第一個數字：search 找到即停，
+        # 不像 findall 把整串數字都建成 list 再丟棄
+        number_match = _NUMBER_RE.search(user_input)
+        if number_match:
+            distance = float(number_match.group(0))
             # 如果是公里，轉換為米
             if any(
-                km_word in user_input.lower() for km_word in ["km", "公里", "kilometer"]
+                km_word in user_input_lower for km_word in ["km", "公里", "kilometer"]
             ):
                 return int(distance * 1000)
             else:
@@ -86,54 +182,46 @@ def _extract_radius_from_input(user_input: str) -> int:
     return 0
 
 
-def _extract_cuisine_from_input(user_input: str) -> str:
-    """從用戶輸入中提取菜系信息"""
-    cuisine_keywords = {
-        "chinese": ["中式", "中菜", "chinese", "中國菜", "中餐"],
-        "japanese": ["日式", "日菜", "japanese", "日本菜", "日餐"],
-        "italian": ["義式", "義大利", "italian", "義大利菜", "意大利"],
-        "sichuan": ["川菜", "sichuan", "四川菜", "川式"],
-        "korean": ["韓式", "韓菜", "korean", "韓國菜", "韓餐"],
-        "thai": ["泰式", "泰菜", "thai", "泰國菜", "泰餐"],
-        "vietnamese": ["越式", "越菜", "vietnamese", "越南菜", "越餐"],
-    }
-
-    user_input_lower = user_input.lower()
-    for cuisine_type, keywords in cuisine_keywords.items():
-        if any(keyword in user_input_lower for keyword in keywords):
-            return cuisine_type
+def canonical_cuisine(alias: str) -> str:
+    """別名 → 標準菜系代碼的 O(1) 精確查詢"""
+    return _CUISINE_ALIAS_INDEX.get(alias.lower(), "")
 
-    return ""
 
+def _extract_cuisine_from_input(
+    user_input: str, user_input_lower: Optional[str] = None
+) -> str:
+    """從用戶輸入中提取菜系信息"""
+    if user_input_lower is None:
+        user_input_lower = user_input.lower()
+    match = _CUISINE_RE.search(user_input_lower)
+    return _CUISINE_ALIAS_INDEX[match.group(0)] if match else ""
 
-def _extract_optional_params(user_input: str, collected_info: Dict) -> None:
-    """提取可選參數"""
-    # 提取價格偏好
-    if "price_preference" not in collected_info:
-        price_keywords = {
-            "budget": ["便宜", "實惠", "cheap", "budget", "省錢"],
-            "mid_range": ["中等", "一般", "moderate", "中價"],
-            "expensive": ["高檔", "昂貴", "expensive", "奢華", "高級"],
-        }
 
+def _extract_optional_params(
+    user_input: str, collected_info: Dict, user_input_lower: Optional[str] = None
+) -> None:
+    """提取可選參數（小寫副本由呼叫端傳入，只做一次）"""
+    if user_input_lower is None:
         user_input_lower = user_input.lower()
-        for price_level, keywords in price_keywords.items():
-            if any(keyword in user_input_lower for keyword in keywords):
-                collected_info["price_preference"] = price_level
-                break
+
+    # 提取價格偏好（單次正則掃描取代逐關鍵字子字串測試）
+    if "price_preference" not in collected_info:
+        price_match = _PRICE_RE.search(user_input_lower)
+        if price_match:
+            collected_info["price_preference"] = _PRICE_ALIAS_INDEX[
+                price_match.group(0)
+            ]
 
     # 提取評分要求
-    rating_match = re.search(r"評分.*?(\d+(?:\.\d+)?)", user_input)
+    rating_match = _RATING_RE.search(user_input)
     if rating_match and "min_rating" not in collected_info:
         collected_info["min_rating"] = float(rating_match.group(1))
 
     # 提取是否嘗新偏好
     if "try_new" not in collected_info:
-        if any(word in user_input.lower() for word in ["新", "new", "嘗試", "新鮮"]):
+        if _TRY_NEW_RE.search(user_input_lower):
             collected_info["try_new"] = True
-        elif any(
-            word in user_input.lower() for word in ["熟悉", "familiar", "經典", "傳統"]
-        ):
+        elif _TRY_FAMILIAR_RE.search(user_input_lower):
             collected_info["try_new"] = False
 
 
@@ -176,6 +264,6 @@ def _generate_final_json_message(collected_info: Dict) -> str:
     if "min_rating" in collected_info:
         search_params["min_rating"] = collected_info["min_rating"]
 
-    # 格式化 JSON
-    json_str = json.dumps(search_params, indent=2, ensure_ascii=False)
+    # 格式化 JSON（orjson 原生輸出 UTF-8，無 ensure_ascii 轉義成本）
+    json_str = orjson.dumps(search_params, option=orjson.OPT_INDENT_2).decode()
     return f"```json\n{json_str}\n```"
@@ -1,7 +1,10 @@
 # app/utils/geo.py
 import math
+from functools import lru_cache
 from typing import Optional, Tuple
 
+import numpy as np
+
 from app.models.requests import LocationCoordinates
 
 
@@ -20,15 +23,36 @@ class GeoUtils:
         Returns:
             距離（公里）
         """
-        # 將角度轉換為弧度
-        lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+        return GeoUtils.calculate_distance_rad(
+            math.radians(lat1), math.radians(lon1), lat2, lon2
+        )
+
+    @staticmethod
+    def calculate_distance_rad(
+        lat1_rad: float, lon1_rad: float, lat2: float, lon2: float
+    ) -> float:
+        """
+        Haversine 距離計算，第一點已先轉為弧度
+
+        在同一位置對多家餐廳計算距離時，可先轉換一次用戶座標，
+        避免迴圈內重複呼叫 math.radians。
+
+        Args:
+            lat1_rad, lon1_rad: 第一個點的緯度和經度（弧度）
+            lat2, lon2: 第二個點的緯度和經度（角度）
+
+        Returns:
+            距離（公里）
+        """
+        lat2_rad = math.radians(lat2)
+        lon2_rad = math.radians(lon2)
 
         # Haversine 公式
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
+        dlat = lat2_rad - lat1_rad
+        dlon = lon2_rad - lon1_rad
         a = (
             math.sin(dlat / 2) ** 2
-            + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
+            + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
         )
         c = 2 * math.asin(math.sqrt(a))
 
@@ -36,6 +60,89 @@ class GeoUtils:
         r = 6371
         return c * r
 
+    @staticmethod
+    def calculate_distance_vectorized(
+        user_lat: float, user_lon: float, lats: np.ndarray, lons: np.ndarray
+    ) -> np.ndarray:
+        """
+        使用 Haversine 公式批次計算用戶與多個點的距離（公里）
+
+        Args:
+            user_lat, user_lon: 用戶位置的緯度和經度
+            lats, lons: 多個目標點的緯度和經度陣列
+
+        Returns:
+            距離陣列（公里）
+        """
+        user_lat_rad = math.radians(user_lat)
+        user_lon_rad = math.radians(user_lon)
+        lats_rad = np.radians(lats)
+        lons_rad = np.radians(lons)
+
+        # Haversine 公式（向量化，in-place 重用緩衝區減少中間陣列配置）
+        cos_lats = np.cos(lats_rad)
+
+        # lons_rad → cos(lat1)*cos(lat2)*sin²(dlon/2)
+        np.subtract(lons_rad, user_lon_rad, out=lons_rad)
+        np.multiply(lons_rad, 0.5, out=lons_rad)
+        np.sin(lons_rad, out=lons_rad)
+        np.square(lons_rad, out=lons_rad)
+        np.multiply(lons_rad, cos_lats, out=lons_rad)
+        np.multiply(lons_rad, math.cos(user_lat_rad), out=lons_rad)
+
+        # lats_rad → sin²(dlat/2)，再累加成 a、開根、arcsin
+        np.subtract(lats_rad, user_lat_rad, out=lats_rad)
+        np.multiply(lats_rad, 0.5, out=lats_rad)
+        np.sin(lats_rad, out=lats_rad)
+        np.square(lats_rad, out=lats_rad)
+        np.add(lats_rad, lons_rad, out=lats_rad)
+        np.sqrt(lats_rad, out=lats_rad)
+        np.arcsin(lats_rad, out=lats_rad)
+
+        # c * 地球半徑（公里）
+        np.multiply(lats_rad, 2 * 6371.0, out=lats_rad)
+        return lats_rad
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def cheap_ruler(latitude: float) -> Tuple[float, float]:
+        """計算 cheap-ruler 平面近似的經/緯度每度公里係數 (kx, ky)
+
+        城市級半徑（數公里）內，緯度相關的係數可視為常數，
+        之後每個點只需乘法與一次開根號，省去逐點的三角函數。
+        係數展開自 WGS84 橢球（Mapbox cheap-ruler 的做法），
+        小半徑下精度甚至優於球面 Haversine。
+        """
+        cos1 = math.cos(math.radians(latitude))
+        cos2 = 2 * cos1 * cos1 - 1
+        cos3 = 2 * cos1 * cos2 - cos1
+        cos4 = 2 * cos1 * cos3 - cos2
+        cos5 = 2 * cos1 * cos4 - cos3
+        kx = 111.41513 * cos1 - 0.09455 * cos3 + 0.00012 * cos5
+        ky = 111.13209 - 0.56605 * cos2 + 0.0012 * cos4
+        return kx, ky
+
+    @staticmethod
+    def calculate_distance_cheap_vectorized(
+        user_lat: float, user_lon: float, lats: np.ndarray, lons: np.ndarray
+    ) -> np.ndarray:
+        """cheap-ruler 平面近似的批次距離計算（公里）
+
+        內核只剩 2 減、2 乘、2 平方、1 開根，適用於
+        城市級半徑的搜尋；大範圍計算仍應使用
+        calculate_distance_vectorized。
+        """
+        kx, ky = GeoUtils.cheap_ruler(user_lat)
+        dx = np.subtract(lons, user_lon)
+        np.multiply(dx, kx, out=dx)
+        np.square(dx, out=dx)
+        dy = np.subtract(lats, user_lat)
+        np.multiply(dy, ky, out=dy)
+        np.square(dy, out=dy)
+        np.add(dx, dy, out=dx)
+        np.sqrt(dx, out=dx)
+        return dx
+
     @staticmethod
     def is_valid_coordinates(latitude: float, longitude: float) -> bool:
         """
@@ -51,6 +158,7 @@ class GeoUtils:
         return (-90 <= latitude <= 90) and (-180 <= longitude <= 180)
 
     @staticmethod
+    @lru_cache(maxsize=1024)
     def parse_coordinates_string(coord_str: str) -> Optional[LocationCoordinates]:
         """
         從字串解析座標
@@ -68,6 +176,21 @@ class GeoUtils:
         if not coord_str:
             return None
 
+        # 快速路徑：最常見的 "25.0330,121.5654" 格式直接 split + float，
+        # 跳過空格清理與 lat:/lng: 格式判斷
+        if coord_str.count(",") == 1 and "lat:" not in coord_str:
+            try:
+                lat_part, lng_part = coord_str.split(",", 1)
+                latitude = float(lat_part)
+                longitude = float(lng_part)
+                if GeoUtils.is_valid_coordinates(latitude, longitude):
+                    return LocationCoordinates(
+                        latitude=latitude, longitude=longitude
+                    )
+                return None
+            except ValueError:
+                pass
+
         try:
             # 移除空格
             coord_str = coord_str.replace(" ", "")
@@ -98,11 +221,12 @@ class GeoUtils:
         return None
 
     @staticmethod
+    @lru_cache(maxsize=1024)
     def get_bounding_box(
         center_lat: float, center_lon: float, radius_km: float
     ) -> Tuple[float, float, float, float]:
         """
-        根據中心點和半徑計算邊界框
+        根據中心點和半徑計算邊界框（純函式，相同輸入直接回快取）
 
         Args:
             center_lat: 中心點緯度
@@ -145,4 +269,14 @@ class GeoUtils:
         Returns:
             格式化的座標字串
         """
-        return f"{coords.latitude:.{precision}f},{coords.longitude:.{precision}f}"
+        return GeoUtils._format_coordinates_cached(
+            coords.latitude, coords.longitude, precision
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _format_coordinates_cached(
+        latitude: float, longitude: float, precision: int
+    ) -> str:
+        """座標格式化的快取層（同一組座標重複出現時免去字串格式化）"""
+        return f"{latitude:.{precision}f},{longitude:.{precision}f}"
@@ -1,9 +1,13 @@
+import time
 from datetime import datetime
 from typing import Dict, Optional
 
 from app.models.user_session import UserSession
 from shared.utils.session_interface import SessionInterface
 
+# 過期掃描的最小間隔（秒）：避免每次 get 都全量掃描
+_CLEANUP_INTERVAL = 60.0
+
 
 class InMemorySessionRepository(SessionInterface):
     """記憶體儲存會話"""
@@ -11,20 +15,37 @@ class InMemorySessionRepository(SessionInterface):
     def __init__(self, session_timeout: int = 3600):
         self.sessions: Dict[str, UserSession] = {}
         self.session_timeout = session_timeout
+        self._last_cleanup = time.monotonic()
+
+    def _is_expired(self, session: UserSession, now: datetime) -> bool:
+        return (now - session.updated_at).total_seconds() > self.session_timeout
+
+    def _cleanup_expired(self, force: bool = False):
+        """全量過期掃描，至多每 _CLEANUP_INTERVAL 秒執行一次
+
+        熱路徑（get）只檢查命中的那一筆，全量掃描以時間間隔節流，
+        讓單次查詢成本與會話總數脫鉤。
+        """
+        now_mono = time.monotonic()
+        if not force and now_mono - self._last_cleanup < _CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = now_mono
 
-    def _cleanup_expired(self):
         now = datetime.now()
         expired = [
-            uid
-            for uid, s in self.sessions.items()
-            if (now - s.updated_at).total_seconds() > self.session_timeout
+            uid for uid, s in self.sessions.items() if self._is_expired(s, now)
         ]
         for uid in expired:
             del self.sessions[uid]
 
     def get(self, user_id: str) -> Optional[UserSession]:
         self._cleanup_expired()
-        return self.sessions.get(user_id)
+        session = self.sessions.get(user_id)
+        # 命中的會話逐筆惰性檢查，過期即剔除
+        if session is not None and self._is_expired(session, datetime.now()):
+            del self.sessions[user_id]
+            return None
+        return session
 
     def save(self, session: UserSession) -> None:
         self.sessions[session.user_id] = session
@@ -33,5 +54,5 @@ class InMemorySessionRepository(SessionInterface):
         return self.sessions.pop(user_id, None) is not None
 
     def list_all(self) -> Dict[str, UserSession]:
-        self._cleanup_expired()
+        self._cleanup_expired(force=True)
         return dict(self.sessions)
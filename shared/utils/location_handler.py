@@ -1,100 +1,157 @@
 # app/services/location_handler.py
 """位置處理服務 - 精簡版"""
 
-from typing import Any, Dict, Optional, Union
+import sys
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional, Union
 
 from app.models.requests import LocationCoordinates
 from shared.utils.geo import GeoUtils
 
+# 位置類型常數：intern 後比較可走指標比對的快路徑
+_COORDINATES = sys.intern("coordinates")
+_ADDRESS = sys.intern("address")
+_NONE = sys.intern("none")
 
-class LocationHandler:
-    """位置處理器 - 精簡版"""
+# 預設搜尋半徑（公里）：依位置類型查表，未知類型走後備值
+DEFAULT_RADIUS = {"coordinates": 5.0, "address": 10.0, "none": 15.0}
+_FALLBACK_RADIUS_KM = 15.0
 
-    # 預設搜尋半徑（公里）
-    DEFAULT_RADIUS = {"coordinates": 5.0, "address": 10.0, "none": 15.0}
 
-    @staticmethod
-    def process_location(
-        location: Union[str, LocationCoordinates, None],
-    ) -> Dict[str, Any]:
-        """處理位置資訊，統一轉換為標準格式"""
-
-        if location is None:
-            return {"type": "none"}
-
-        if isinstance(location, str):
-            # 嘗試解析座標字串
-            coords = GeoUtils.parse_coordinates_string(location)
-            if coords:
-                return {
-                    "type": "coordinates",
-                    "latitude": coords.latitude,
-                    "longitude": coords.longitude,
-                }
-            return {"type": "address", "address": location}
-
-        if isinstance(location, LocationCoordinates):
-            return {
-                "type": "coordinates",
-                "latitude": location.latitude,
-                "longitude": location.longitude,
-            }
-
-        return {"type": "unknown"}
+class ProcessedLocation(NamedTuple):
+    """標準化後的位置資料
 
-    @staticmethod
-    def get_search_radius_km(location_data: Dict[str, Any]) -> float:
-        """根據位置類型決定搜尋半徑"""
-        location_type = location_data.get("type", "none")
-        return LocationHandler.DEFAULT_RADIUS.get(location_type, 15.0)
+    以 NamedTuple 取代逐請求配置的 dict：欄位以位移存取，
+    不可變所以可直接作為快取鍵。
+    """
+
+    type: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    address: Optional[str] = None
+    raw: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """需要 JSON 可序列化的 metadata 時才轉成 dict"""
+        return {k: v for k, v in self._asdict().items() if v is not None}
+
+
+_LOCATION_NONE = ProcessedLocation(type=_NONE)
 
-    @staticmethod
-    def calculate_distance(
-        location_data: Dict[str, Any], restaurant_lat: float, restaurant_lon: float
-    ) -> Optional[float]:
-        """計算餐廳與用戶位置的距離（公里）"""
 
-        if location_data.get("type") != "coordinates":
-            return None
+# 位置處理為無狀態的熱路徑，使用模組層級函式省去每次呼叫的
+# 類別屬性查找；LocationHandler 保留為薄門面以維持既有呼叫方式
 
-        user_lat = location_data.get("latitude")
-        user_lon = location_data.get("longitude")
 
-        if user_lat is None or user_lon is None:
-            return None
+def _process_none(location: None) -> ProcessedLocation:
+    """處理未提供位置的情況"""
+    return _LOCATION_NONE
 
-        return GeoUtils.calculate_distance(
-            user_lat, user_lon, restaurant_lat, restaurant_lon
+
+@lru_cache(maxsize=4096)
+def _process_location_str(location: str) -> ProcessedLocation:
+    """解析字串位置，回傳不可變結果以便快取
+
+    同一個地址或座標字串經常重複出現（用戶重送相同位置），
+    快取解析結果可省去重複的座標解析工作。
+    """
+    coords = GeoUtils.parse_coordinates_string(location)
+    if coords:
+        return ProcessedLocation(
+            type=_COORDINATES,
+            latitude=coords.latitude,
+            longitude=coords.longitude,
         )
+    return ProcessedLocation(type=_ADDRESS, address=location)
 
-    @staticmethod
-    def format_location(location_data: Dict[str, Any]) -> str:
-        """格式化位置顯示"""
-        location_type = location_data.get("type")
-
-        if location_type == "coordinates":
-            lat = location_data.get("latitude")
-            lon = location_data.get("longitude")
-            return f"座標 ({lat:.4f}, {lon:.4f})"
-        elif location_type == "address":
-            return location_data.get("address", "未知地址")
-        else:
-            return "未指定位置"
 
-    @staticmethod
-    def is_valid_location(location_data: Dict[str, Any]) -> bool:
-        """檢查位置資料是否有效"""
-        location_type = location_data.get("type")
+def _process_coords(location: LocationCoordinates) -> ProcessedLocation:
+    """處理座標物件"""
+    return ProcessedLocation(
+        type=_COORDINATES,
+        latitude=location.latitude,
+        longitude=location.longitude,
+    )
+
+
+# 依輸入型別分派的查表，模組載入時建立一次（避免逐一 isinstance 判斷）
+_DISPATCH = {
+    type(None): _process_none,
+    str: _process_location_str,
+    LocationCoordinates: _process_coords,
+}
+
+
+def process_location(
+    location: Union[str, LocationCoordinates, None],
+) -> ProcessedLocation:
+    """處理位置資訊，統一轉換為標準格式"""
+    handler = _DISPATCH.get(type(location))
+    if handler:
+        return handler(location)
+    return ProcessedLocation(type="unknown", raw=str(location))
+
 
-        if location_type == "coordinates":
-            return (
-                location_data.get("latitude") is not None
-                and location_data.get("longitude") is not None
-            )
-        elif location_type == "address":
-            return bool(location_data.get("address"))
+def get_search_radius_km(location_data: ProcessedLocation) -> float:
+    """根據位置類型決定搜尋半徑"""
+    return DEFAULT_RADIUS.get(location_data.type, _FALLBACK_RADIUS_KM)
 
-        return location_type == "none"  # "none" 也是有效狀態
+
+def calculate_distance(
+    location_data: ProcessedLocation, restaurant_lat: float, restaurant_lon: float
+) -> Optional[float]:
+    """計算餐廳與用戶位置的距離（公里）"""
+    if location_data.type != _COORDINATES:
+        return None
+
+    user_lat = location_data.latitude
+    user_lon = location_data.longitude
+
+    if user_lat is None or user_lon is None:
+        return None
+
+    return GeoUtils.calculate_distance(
+        user_lat, user_lon, restaurant_lat, restaurant_lon
+    )
+
+
+def format_location(location_data: ProcessedLocation) -> str:
+    """格式化位置顯示"""
+    loc_type = location_data.type
+
+    if loc_type == _COORDINATES:
+        return f"座標 ({location_data.latitude:.4f}, {location_data.longitude:.4f})"
+    elif loc_type == _ADDRESS:
+        return location_data.address or "未知地址"
+    else:
+        return "未指定位置"
+
+
+def is_valid_location(location_data: ProcessedLocation) -> bool:
+    """檢查位置資料是否有效"""
+    loc_type = location_data.type
+
+    if loc_type == _COORDINATES:
+        return (
+            location_data.latitude is not None
+            and location_data.longitude is not None
+        )
+    elif loc_type == _ADDRESS:
+        return bool(location_data.address)
+
+    return loc_type == _NONE  # "none" 也是有效狀態
+
+
+class LocationHandler:
+    """位置處理器 - 薄門面，實作在模組層級函式"""
+
+    DEFAULT_RADIUS = DEFAULT_RADIUS
+
+    process_location = staticmethod(process_location)
+    get_search_radius_km = staticmethod(get_search_radius_km)
+    calculate_distance = staticmethod(calculate_distance)
+    format_location = staticmethod(format_location)
+    is_valid_location = staticmethod(is_valid_location)
 
 
 # 輔助類別：位置處理器（進階功能）
@@ -106,17 +163,17 @@ class LocationProcessor:
         location: Union[str, LocationCoordinates, None],
     ) -> Dict[str, Any]:
         """處理位置輸入並添加額外資訊"""
-        location_data = LocationHandler.process_location(location)
+        location_data = process_location(location)
+
+        result = location_data.to_dict()
 
         # 添加搜尋半徑
-        location_data["search_radius_km"] = LocationHandler.get_search_radius_km(
-            location_data
-        )
+        result["search_radius_km"] = get_search_radius_km(location_data)
 
         # 添加格式化顯示
-        location_data["formatted"] = LocationHandler.format_location(location_data)
+        result["formatted"] = format_location(location_data)
 
         # 添加有效性檢查
-        location_data["is_valid"] = LocationHandler.is_valid_location(location_data)
+        result["is_valid"] = is_valid_location(location_data)
 
-        return location_data
+        return result